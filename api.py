@@ -2,241 +2,2545 @@
 # -*- coding: utf-8 -*-
 
 import http.server
+import http.client
+import asyncio
+import io
+import socket
 import socketserver
 import json
 import os
+import sys
+import logging
+import logging.handlers
 from urllib.parse import urlparse, parse_qs
 import re
 import threading # For locking file access
 from http import HTTPStatus # Use standard HTTP status codes
-from datetime import datetime # For timestamp in filename
+from datetime import datetime, timedelta # For timestamp in filename
 import time # For timezone info (though datetime handles it better)
-import shutil # For file copying (backup)
+import gzip
+import argparse
+import itertools
+import math
+import zlib
+import hashlib
+import heapq
+import bisect
+import operator
+import queue
+import mmap
+import base64
+import email.utils
+from array import array
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+try:
+    import numpy as np # Optional: vectorized search scoring
+except ImportError:
+    np = None
 
 # --- Configuration ---
 HOST = "localhost"
 PORT = 8000
 DATA_FILE = "requirements_data.json"
+JOURNAL_FILE = DATA_FILE + ".journal" # Mutations not yet folded into DATA_FILE
+COMPACT_INTERVAL_SECONDS = 30 # How often the journal is folded into DATA_FILE
+COMPACT_JOURNAL_BYTES = 4 * 1024 * 1024 # Compact early once the journal grows past this
+BACKUP_DIR = "backups" # Hourly compressed snapshots and deltas
+BACKUP_RETENTION_DAYS = 7
+BACKUP_CHECK_SECONDS = 60 # How often the backup thread looks for a new hour
+EMBEDDINGS_FILE = DATA_FILE + ".embeddings" # float32 search vectors (+ ".json" metadata)
+EMBEDDER = os.environ.get("REQAI_EMBEDDER", "hashing") # Key into EMBEDDERS
+SEARCH_DEFAULT_K = 10
+ANN_MIN_ROWS = 10000 # Below this, search scores every row exactly
+ANN_NLIST = 0 # IVF clusters; 0 picks sqrt(rows)
+ANN_NPROBE = int(os.environ.get("REQAI_ANN_NPROBE", "16")) # Clusters scored per query: higher = better recall, slower
+MAX_WORKERS = int(os.environ.get("REQAI_MAX_WORKERS", "32")) # Size of the request worker pool
+KEEPALIVE_TIMEOUT = 5 # Seconds an idle keep-alive connection may hold a worker
+MAX_CONNECTIONS = int(os.environ.get("REQAI_MAX_CONNECTIONS", "10000")) # Open connections the asyncio server accepts
+COMPRESS_MIN_BYTES = 1024 # Smaller responses are sent uncompressed
+COMPRESS_LEVEL = 6
+CHANGE_FEED_SIZE = 1000 # Transactions kept for /api/changes?since= and stream resumption
+CHANGE_STREAM_HEARTBEAT = 15 # Seconds between keep-alive comments on an idle change stream
+CHANGE_STREAM_RETRY_MS = 3000 # How long EventSource clients wait before reconnecting
+ON_DELETE = os.environ.get("REQAI_ON_DELETE", "allow") # "restrict" refuses to delete items that others reference
 API_PREFIX = "/api/entities"
+LOG_LEVEL = os.environ.get("REQAI_LOG_LEVEL", "INFO") # DEBUG adds per-request detail
+PROFILER_ALLOWED = os.environ.get("REQAI_PROFILER") == "1" # /api/profile is refused unless opted in (or --profiler)
+PROFILE_INTERVAL = 0.005 # Seconds between stack samples while the profiler runs
 
+# --- Logging, Metrics and Profiling ---
+logger = logging.getLogger("reqai")
+access_logger = logging.getLogger("reqai.access")
 
-# --- Thread-safe Data Handling (Unchanged) ---
-data_lock = threading.Lock()
+def setup_logging(level=LOG_LEVEL):
+    """Routes the "reqai" loggers to stderr through a queue and returns the started QueueListener.
 
-def load_data():
-    # ... (keep existing load_data function) ...
-    with data_lock:
-        if os.path.exists(DATA_FILE):
+    Request threads only enqueue records; a listener thread formats and
+    writes them, so a slow terminal never holds up a response. Disabled
+    levels cost a level check, as messages are formatted lazily.
+    """
+    records = queue.SimpleQueue()
+    output = logging.StreamHandler()
+    output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    listener = logging.handlers.QueueListener(records, output)
+    logger.addHandler(logging.handlers.QueueHandler(records))
+    logger.setLevel(level.upper() if isinstance(level, str) else level)
+    logger.propagate = False
+    listener.start()
+    return listener
+
+class _Metric:
+    """A named family of values keyed by label values. Subclasses define how values accumulate."""
+    type = None
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self._values = {} # label values -> value
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+    def _selector(self, label_values, extra=()):
+        pairs = list(zip(self.labels, label_values)) + list(extra)
+        return "{" + ",".join(f'{name}="{self._escape(value)}"' for name, value in pairs) + "}" if pairs else ""
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for label_values, value in values:
+            lines.extend(self._render_value(label_values, value))
+        return lines
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount=1, *label_values):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def _render_value(self, label_values, value):
+        return [f"{self.name}{self._selector(label_values)} {value:.17g}"]
+
+class Histogram(_Metric):
+    type = "histogram"
+    BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    def observe(self, seconds, *label_values):
+        bucket = bisect.bisect_left(self.BUCKETS, seconds)
+        with self._lock:
+            value = self._values.get(label_values)
+            if value is None:
+                value = self._values[label_values] = [[0] * (len(self.BUCKETS) + 1), 0.0]
+            value[0][bucket] += 1
+            value[1] += seconds
+
+    def time(self, *label_values):
+        """Context manager observing the time spent in its block."""
+        return _Timer(self, label_values)
+
+    def _render_value(self, label_values, value):
+        counts, total = value
+        lines, cumulative = [], 0
+        for bound, count in zip(self.BUCKETS + ("+Inf",), counts):
+            cumulative += count
+            lines.append(f"{self.name}_bucket{self._selector(label_values, [('le', bound)])} {cumulative}")
+        lines.append(f"{self.name}_sum{self._selector(label_values)} {total:.17g}")
+        lines.append(f"{self.name}_count{self._selector(label_values)} {cumulative}")
+        return lines
+
+class _Timer:
+    __slots__ = ("histogram", "label_values", "started")
+
+    def __init__(self, histogram, label_values):
+        self.histogram = histogram
+        self.label_values = label_values
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started, *self.label_values)
+
+class MetricsRegistry:
+    """The metrics served on /api/metrics, in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = [] # Callables returning extra lines, computed at scrape time
+
+    def counter(self, name, help_text, labels=()):
+        self._metrics.append(Counter(name, help_text, labels))
+        return self._metrics[-1]
+
+    def histogram(self, name, help_text, labels=()):
+        self._metrics.append(Histogram(name, help_text, labels))
+        return self._metrics[-1]
+
+    def add_collector(self, collector):
+        self._collectors.append(collector)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+metrics = MetricsRegistry()
+HTTP_REQUEST_SECONDS = metrics.histogram("reqai_http_request_duration_seconds", "Time from request line to end of response.", ("method", "route"))
+HTTP_REQUESTS = metrics.counter("reqai_http_requests_total", "Requests handled.", ("method", "route", "status"))
+HTTP_RESPONSE_BYTES = metrics.counter("reqai_http_response_bytes_total", "Bytes written to clients, headers included.", ("route",))
+LOCK_WAIT_SECONDS = metrics.counter("reqai_lock_wait_seconds_total", "Time spent waiting to acquire a lock.", ("lock", "mode"))
+LOCK_ACQUISITIONS = metrics.counter("reqai_lock_acquisitions_total", "Lock acquisitions.", ("lock", "mode"))
+LOAD_DATA_SECONDS = metrics.histogram("reqai_load_data_seconds", "Time reading and parsing the data file.")
+SAVE_DATA_SECONDS = metrics.histogram("reqai_save_data_seconds", "Time writing the data file (compaction, restore).")
+JSON_DUMPS_SECONDS = metrics.histogram("reqai_json_dumps_seconds", "Time serializing JSON.", ("use",))
+
+class SamplingProfiler:
+    """Samples the Python stacks of request threads from a background thread.
+
+    Runs only between start() and stop(). Only threads registered in
+    `active` are sampled: the handler adds itself once a request line has
+    arrived and removes itself after the response, so idle keep-alive waits
+    are not counted. stacks() returns the samples in the collapsed
+    "outer;...;inner count" format read by flamegraph.pl and speedscope.
+    """
+
+    def __init__(self):
+        self.active = set() # Idents of threads handling a request
+        self._samples = {} # collapsed stack -> count
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.sample_count = 0
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self, interval=PROFILE_INTERVAL):
+        """Starts sampling every `interval` seconds, discarding the previous samples."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._samples, self.sample_count = {}, 0
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, args=(interval,), name="profiler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join()
+
+    def _run(self, interval):
+        while not self._stop.wait(interval):
+            self.sample_count += 1
+            for ident, frame in sys._current_frames().items():
+                if ident not in self.active:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                key = ";".join(reversed(stack))
+                self._samples[key] = self._samples.get(key, 0) + 1
+
+    def stacks(self):
+        samples = dict(self._samples)
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(samples.items(), key=lambda entry: -entry[1]))
+
+profiler = SamplingProfiler()
+
+
+# --- Thread-safe Data Handling ---
+class ReadWriteLock:
+    """Lets many readers in at once, or a single writer.
+
+    Writers are preferred: once a writer is waiting, new readers queue behind
+    it, so a steady stream of GETs cannot starve mutations. Not reentrant.
+    Time spent waiting to acquire it is counted in the lock metrics under `name`.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    def _acquired(self, mode, started):
+        LOCK_WAIT_SECONDS.inc(time.perf_counter() - started, self.name, mode)
+        LOCK_ACQUISITIONS.inc(1, self.name, mode)
+
+    @contextmanager
+    def read(self):
+        started = time.perf_counter()
+        with self._cond:
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        self._acquired("read", started)
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        started = time.perf_counter()
+        with self._cond:
+            self._writers_waiting += 1
             try:
-                with open(DATA_FILE, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except (json.JSONDecodeError, IOError) as e:
-                print(f"Error loading data from {DATA_FILE}: {e}. Returning empty structure.")
-                return {
-                    "stakeholders": [], "goals_and_objectives": [], "business_processes": [],
-                    "requirements": [], "systems_and_applications": [], "data_entities": [],
-                    "risks_and_constraints": [], "metrics_and_kpis": []
-                }
+                while self._writer or self._readers:
+                    self._cond.wait()
+            finally:
+                self._writers_waiting -= 1
+            self._writer = True
+        self._acquired("write", started)
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
+data_lock = ReadWriteLock("data_lock")
+
+ENTITY_TYPES = [
+    "stakeholders", "goals_and_objectives", "business_processes",
+    "requirements", "systems_and_applications", "data_entities",
+    "risks_and_constraints", "metrics_and_kpis"
+]
+
+ID_PREFIXES = {
+    "stakeholders": "STK", "goals_and_objectives": "GOAL", "business_processes": "BP",
+    "requirements": "REQ", "systems_and_applications": "SYS", "data_entities": "DE",
+    "risks_and_constraints": "RISK", "metrics_and_kpis": "KPI"
+}
+ID_PATTERN = re.compile(r"([a-zA-Z]+)_?(\d+)") # Optionally an underscore between prefix and number
+
+class StorageError(Exception):
+    """Raised when a mutation could not be persisted to the journal."""
+
+def empty_data():
+    return {entity_type: [] for entity_type in ENTITY_TYPES}
+
+def read_data_file(path):
+    """Parses a data file from disk. Returns None if it is missing or unreadable."""
+    if not os.path.exists(path):
+        logger.warning("%s not found. Returning empty structure.", path)
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f, LOAD_DATA_SECONDS.time():
+            return json.load(f)
+    except (json.JSONDecodeError, IOError) as e:
+        logger.error("Error loading data from %s: %s. Returning empty structure.", path, e)
+        return None
+
+
+class EntityCollection:
+    """The items of one entity type, indexed by ID.
+
+    Items live in an insertion-ordered dict keyed by ID, which doubles as the
+    id -> position index: lookup, update and delete are O(1) and the order on
+    disk is preserved. Items whose ID is missing or repeated are kept under
+    private keys so that nothing is dropped when the file is written back.
+
+    The ID prefix and highest number in use are tracked as items are added,
+    so next_id() is O(1). Numbers are not handed out again after a delete.
+    """
+
+    def __init__(self, entity_type, items=()):
+        self.entity_type = entity_type
+        self._items = {}
+        self._shadowed = {} # id -> private keys of later items repeating that ID
+        self._next_private_key = 0
+        # Caches filled lazily by readers, which may race under the shared read
+        # lock: each builds into a local and returns that. Only mutations,
+        # which hold the write lock, reset them.
+        self._view = None # Cached list form
+        self._positions = None # Cached key -> index in the list form
+        self._id_prefix = None # Taken from the first ID seen, so new IDs look like existing ones
+        self._max_id_number = 0
+        for item in items:
+            self.append(item)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, item_id):
+        return item_id in self._items
+
+    def get(self, item_id):
+        return self._items.get(item_id)
+
+    def as_list(self):
+        """Returns the items as a list. The list is shared; do not modify it."""
+        view = self._view
+        if view is None:
+            view = self._view = list(self._items.values())
+        return view
+
+    def keyed_items(self):
+        """Returns a view of (key, item) pairs. The key is the ID, or a private key for an item without a usable one."""
+        return self._items.items()
+
+    def positions(self):
+        """Returns {key: index in as_list()}. Shared; do not modify it."""
+        positions = self._positions
+        if positions is None:
+            positions = self._positions = {key: position for position, key in enumerate(self._items)}
+        return positions
+
+    def next_id(self):
+        """The ID for the next new item, e.g. "REQ_42"."""
+        prefix = self._id_prefix or ID_PREFIXES.get(self.entity_type, self.entity_type[:3].upper())
+        return f"{prefix}_{self._max_id_number + 1}"
+
+    def _track_id(self, item_id):
+        match = ID_PATTERN.match(item_id)
+        if self._id_prefix is None:
+            self._id_prefix = match.group(1) if match else ''.join(filter(str.isalpha, item_id)) or self.entity_type[:3].upper()
+        if match and match.group(1) == self._id_prefix:
+            self._max_id_number = max(self._max_id_number, int(match.group(2)))
+
+    def append(self, item):
+        item_id = item.get("id") if isinstance(item, dict) else None
+        if isinstance(item_id, str) and item_id:
+            self._track_id(item_id)
+        if isinstance(item_id, str) and item_id not in self._items:
+            key = item_id
         else:
-            print(f"Warning: {DATA_FILE} not found. Returning empty structure.")
-            return {
-                "stakeholders": [], "goals_and_objectives": [], "business_processes": [],
-                "requirements": [], "systems_and_applications": [], "data_entities": [],
-                "risks_and_constraints": [], "metrics_and_kpis": []
-            }
-
-def save_data(data_to_save):
-    # ... (keep existing save_data function) ...
-    with data_lock:
-        # --- Backup Logic ---
+            key = ("private", self._next_private_key)
+            self._next_private_key += 1
+            if isinstance(item_id, str):
+                self._shadowed.setdefault(item_id, []).append(key)
+        self._items[key] = item
+        self._view = self._positions = None
+
+    def replace(self, item_id, item):
+        self._items[item_id] = item
+        self._view = None # Keys and positions are unchanged
+
+    def remove(self, item_id):
+        """Removes every item with item_id. Returns False if there was none."""
+        if self._items.pop(item_id, None) is None:
+            return False
+        for key in self._shadowed.pop(item_id, ()):
+            del self._items[key]
+        self._view = self._positions = None
+        return True
+
+
+def apply_journal_op(collections, op):
+    """Applies one journal operation to a dict of EntityCollections.
+
+    Operations carry whole items, so applying one twice is harmless; this is
+    what makes replaying a journal over a newer snapshot safe.
+    """
+    collection = collections.setdefault(op["type"], EntityCollection(op["type"]))
+    if op["op"] == "put":
+        item = op["item"]
+        if item["id"] in collection:
+            collection.replace(item["id"], item)
+        else:
+            collection.append(item)
+    elif op["op"] == "delete":
+        collection.remove(op["id"])
+
+
+class Journal:
+    """Append-only write-ahead log of mutations.
+
+    Each line is one transaction: {"version": n, "ops": [...]}. append() only
+    hands the line to the OS; sync() fsyncs it before the mutation is
+    acknowledged, outside data_lock, and concurrent callers share a single
+    fsync. A torn last line (crash mid-append) is dropped on replay, so
+    transactions apply all-or-nothing.
+
+    Compaction renames the live journal aside to compacting_path, or to a
+    numbered segment after it if an earlier compaction failed and left that
+    in place. Replay reads the segments in order, then the live journal.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.compacting_path = path + ".compacting"
+        self._file = None
+        self._retired = [] # Files of rotated-away journals, written but not yet fsync'd
+        self._sync_lock = threading.Lock()
+        self._written_version = 0
+        self._synced_version = 0
+
+    def size(self):
         try:
-            now = datetime.now()
-            backup_file_name = f"requirements_data.{now.strftime('%Y-%m-%d-%H')}.json"
-            
-            if not os.path.exists(backup_file_name):
-                if os.path.exists(DATA_FILE):
-                    shutil.copy2(DATA_FILE, backup_file_name) # copy2 preserves metadata
-                    print(f"Backup created: {backup_file_name}")
-                # else:
-                    # print(f"Skipping backup: {DATA_FILE} does not exist yet.") # Optional: log if source doesn't exist
-            # else:
-                # print(f"Backup for hour {now.strftime('%Y-%m-%d-%H')} already exists: {backup_file_name}") # Optional: log if backup exists
-        except Exception as e:
-            print(f"Error during backup creation: {e}")
-            # Decide if a backup error should prevent saving. For now, it won't.
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+    def append(self, version, ops):
+        """Writes one transaction. Caller holds the data_lock write lock."""
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf-8')
+        with JSON_DUMPS_SECONDS.time("journal"):
+            line = json.dumps({"version": version, "ops": ops}, ensure_ascii=False)
+        self._file.write(line + "\n")
+        self._file.flush()
+        self._written_version = version
+
+    def _sync_retired(self):
+        """fsyncs and closes rotated-away journal files. Caller holds _sync_lock."""
+        while self._retired:
+            retired = self._retired[0]
+            os.fsync(retired.fileno())
+            retired.close()
+            self._retired.pop(0)
+
+    def sync(self, version):
+        """Blocks until every transaction up to `version` is on disk (group commit)."""
+        with self._sync_lock:
+            if self._synced_version >= version:
+                return
+            target = self._written_version
+            self._sync_retired() # Earlier transactions may sit in a journal rotated away since
+            if self._file is not None:
+                os.fsync(self._file.fileno())
+            self._synced_version = target
+
+    def close(self):
+        with self._sync_lock:
+            self._sync_retired()
+            if self._file is not None:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
+                self._file = None
+            self._synced_version = self._written_version
+
+    def compacting_segments(self):
+        """Paths of the journals moved aside for compaction, oldest first."""
+        segments = []
+        while os.path.exists(self.compacting_path + (f".{len(segments)}" if segments else "")):
+            segments.append(self.compacting_path + (f".{len(segments)}" if segments else ""))
+        return segments
+
+    def rotate(self):
+        """Moves the live journal aside for compaction and starts a fresh one.
+
+        Only renames under the caller's write lock; the moved file is fsync'd
+        by the next sync() or by sync_rotated(), outside the lock. If a
+        previous compaction failed, its segments are kept and the live
+        journal becomes the next one.
+        """
+        if self._file is not None:
+            self._file.flush()
+            self._retired.append(self._file)
+            self._file = None
+        if not os.path.exists(self.path):
+            return
+        segments = self.compacting_segments()
+        os.replace(self.path, self.compacting_path + (f".{len(segments)}" if segments else ""))
+
+    def sync_rotated(self):
+        """Makes the journals moved aside by rotate() durable. Call without data_lock held."""
+        with self._sync_lock:
+            self._sync_retired()
+
+    def finish_compaction(self):
+        for segment in reversed(self.compacting_segments()): # Newest first, so a crash midway leaves a gap-free prefix
+            try:
+                os.remove(segment)
+            except FileNotFoundError:
+                pass
+
+    def replay(self, collections):
+        """Applies the pending journal(s) to collections. Returns the last version seen."""
+        self.close()
+        last_version = 0
+        for path in (*self.compacting_segments(), self.path):
+            if not os.path.exists(path):
+                continue
+            with open(path, 'rb') as f:
+                good_offset = 0
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        logger.warning("Ignoring torn entry at end of %s", path)
+                        break
+                    for op in entry["ops"]:
+                        apply_journal_op(collections, op)
+                    last_version = max(last_version, entry.get("version", 0))
+                    good_offset += len(line)
+            if os.path.getsize(path) != good_offset:
+                # Cut the torn tail so later appends start on a clean line.
+                with open(path, 'r+b') as f:
+                    f.truncate(good_offset)
+        return last_version
+
+
+class DataStore:
+    """Keeps the contents of DATA_FILE resident in memory.
+
+    The file is parsed once and reads are served from memory afterwards. It is
+    only re-parsed when its mtime or size changes underneath us, so external
+    edits still show up. Reads share data_lock, mutations hold it exclusively
+    but release it before their journal fsync, so GETs never wait on disk.
+    Items handed out are never mutated in place (updates replace the dict),
+    so callers may read them after the lock is released.
+
+    Mutations are appended to a Journal instead of rewriting the file;
+    compact() folds the journal into the snapshot in the background.
+    """
+
+    def __init__(self, path, journal_path=None):
+        self.path = path
+        self.journal = Journal(journal_path or path + ".journal")
+        self.collections = None # entity type -> EntityCollection
+        self.version = 0 # Bumped on every reload or mutation
+        self.instance_id = os.urandom(4).hex() # Versions restart with the process; this tells runs apart (ETags)
+        self._signature = None
+        self._compact_needed = threading.Event()
+        self._listeners = []
+
+    def add_listener(self, callback):
+        """Registers callback(version, ops), called after every committed mutation.
+
+        ops are the journal ops of the transaction, or None when the data was
+        reloaded from disk. Callbacks run under the write lock, in commit
+        order, and must not block: hand real work to another thread.
+        """
+        self._listeners.append(callback)
+
+    def _notify(self, ops):
+        for callback in self._listeners:
+            try:
+                callback(self.version, ops)
+            except Exception as e:
+                logger.exception("Error in data change listener %r: %s", callback, e)
+
+    def _file_signature(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _current(self):
+        """Returns the resident collections, re-reading the file if it changed. Caller holds the write lock."""
+        signature = self._file_signature()
+        if self.collections is None or signature != self._signature:
+            loaded = read_data_file(self.path)
+            if loaded is None and self.collections is not None and signature is not None:
+                # File exists but is unreadable (e.g. caught mid-write by an external
+                # editor): keep serving what we have and retry on the next access.
+                return self.collections
+            if loaded is None:
+                loaded = empty_data()
+            self.collections = {entity_type: EntityCollection(entity_type, items) for entity_type, items in loaded.items()}
+            self._signature = signature
+            self.version = max(self.version, self.journal.replay(self.collections)) + 1
+            self._notify(None)
+        return self.collections
+
+    @contextmanager
+    def _reading(self):
+        """Yields fresh collections under the read lock, reloading under the write lock if needed."""
+        with data_lock.read():
+            if self.collections is not None and self._file_signature() == self._signature:
+                yield self.collections
+                return
+        with data_lock.write():
+            yield self._current()
+
+    def _as_data(self):
+        return {entity_type: collection.as_list() for entity_type, collection in self.collections.items()}
+
+    def _persist(self, ops):
+        """Journals ops that were just applied in memory. Caller holds the write lock.
+
+        Returns the version to pass to _sync() once the lock is released.
+        """
+        self.version += 1
+        try:
+            self.journal.append(self.version, ops)
+        except (IOError, OSError) as e:
+            self._journal_failed(e)
+        self._notify(ops)
+        if self.journal.size() >= COMPACT_JOURNAL_BYTES:
+            self._compact_needed.set()
+        return self.version
+
+    def _sync(self, version):
+        """Makes a journaled mutation durable. Called without data_lock held."""
+        try:
+            self.journal.sync(version)
+        except (IOError, OSError) as e:
+            with data_lock.write():
+                self._journal_failed(e)
 
-        # --- Original Save Logic ---
+    def _journal_failed(self, error):
+        logger.error("Error writing journal %s: %s", self.journal.path, error)
+        # Memory is now ahead of disk; force a reload so both agree again.
         try:
-            with open(DATA_FILE, 'w', encoding='utf-8') as f:
+            self.journal.close()
+        except (IOError, OSError):
+            pass
+        self.collections = None
+        raise StorageError(f"Failed to journal changes to {self.journal.path}") from error
+
+    def compact(self):
+        """Folds the journal into DATA_FILE via a temp file and an atomic rename.
+
+        The rename happens under the write lock and installs the new file's
+        signature with it, so readers never mistake our own write for an
+        external edit. An external edit made while the temp file was written
+        wins: the compaction is abandoned and retried on top of it.
+        """
+        with data_lock.write():
+            if not (self.journal.size() or os.path.exists(self.journal.compacting_path)):
+                return
+            self._current() # Picks up external edits (and replays the journal over them) before they are overwritten
+            data = self._as_data() # Lists and items are never mutated, so this is a stable snapshot
+            signature = self._signature
+            self.journal.rotate()
+        self.journal.sync_rotated()
+        tmp_path = write_data_file(data, self.path)
+        if tmp_path is None:
+            return # The rotated journal is kept and retried on the next pass
+        with data_lock.write():
+            if self._file_signature() != signature:
+                logger.warning("%s changed on disk during compaction; retrying on the next pass", self.path)
+                os.remove(tmp_path)
+                return
+            os.replace(tmp_path, self.path)
+            self._signature = self._file_signature()
+            self.journal.finish_compaction()
+        fsync_directory(self.path)
+
+    def run_compactor(self, interval=COMPACT_INTERVAL_SECONDS):
+        """Background loop: compacts every `interval` seconds, or sooner if the journal is large."""
+        while True:
+            self._compact_needed.wait(interval)
+            self._compact_needed.clear()
+            try:
+                self.compact()
+            except Exception as e:
+                logger.exception("Error during journal compaction: %s", e)
+
+    def start_compactor(self):
+        thread = threading.Thread(target=self.run_compactor, name="journal-compactor", daemon=True)
+        thread.start()
+        return thread
+
+    # --- Reads ---
+    def snapshot(self):
+        with self._reading():
+            return self._as_data()
+
+    def entity_types(self):
+        with self._reading() as collections:
+            return list(collections.keys())
+
+    def list_items(self, entity_type):
+        """Returns the item list for entity_type (shared, read-only), or None if the type is unknown."""
+        with self._reading() as collections:
+            collection = collections.get(entity_type)
+            return collection.as_list() if collection is not None else None
+
+    def current_version(self):
+        """Returns the data version, reloading first if the file changed on disk."""
+        with self._reading():
+            return self.version
+
+    def read_collections(self):
+        """Context manager yielding the fresh collections under the read lock, for multi-step reads. Do not modify them."""
+        return self._reading()
+
+    def get_item(self, entity_type, item_id):
+        with self._reading() as collections:
+            collection = collections.get(entity_type)
+            return collection.get(item_id) if collection is not None else None
+
+    # --- Mutations ---
+    def create_item(self, entity_type, new_item_data):
+        with data_lock.write():
+            collection = self._current()[entity_type]
+            new_item = dict(new_item_data)
+            new_item['id'] = collection.next_id()
+            collection.append(new_item)
+            version = self._persist([{"op": "put", "type": entity_type, "item": new_item}])
+        self._sync(version)
+        return new_item
+
+    def update_item(self, entity_type, item_id, update_data):
+        """Merges update_data into an item. Returns the updated item, or None if not found."""
+        with data_lock.write():
+            collection = self._current()[entity_type]
+            original_item = collection.get(item_id)
+            if original_item is None:
+                return None
+            updated_item = {**original_item, **update_data, 'id': item_id}
+            collection.replace(item_id, updated_item)
+            version = self._persist([{"op": "put", "type": entity_type, "item": updated_item}])
+        self._sync(version)
+        return updated_item
+
+    def delete_item(self, entity_type, item_id, guard=None):
+        """Removes an item. Returns False if no item had that ID.
+
+        guard(entity_type, item_id), if given, runs under the write lock
+        before the removal and may raise to refuse it.
+        """
+        with data_lock.write():
+            collection = self._current()[entity_type]
+            if item_id not in collection:
+                return False
+            if guard is not None:
+                guard(entity_type, item_id)
+            collection.remove(item_id)
+            version = self._persist([{"op": "delete", "type": entity_type, "id": item_id}])
+        self._sync(version)
+        return True
+
+    @staticmethod
+    def _keeps_id(data):
+        """Whether a put stores data under its own ID rather than a new one."""
+        return isinstance(data.get("id"), str) and bool(data["id"])
+
+    def apply_batch(self, operations):
+        """Applies a list of create/update/put/delete operations as one transaction.
+
+        Each operation is {"op": "create", "type": t, "data": {...}},
+        {"op": "update", "type": t, "id": i, "data": {...}},
+        {"op": "put", "type": t, "data": {...}} (replaces or inserts the item
+        with data's ID, or creates one if it has none) or
+        {"op": "delete", "type": t, "id": i}. Every operation is checked before
+        anything changes, so either all apply or none do (ValueError naming the
+        first bad one). They are journaled as a single entry with one fsync.
+        Returns one result per operation: the created or updated item, or
+        {"id": i} for a delete.
+        """
+        if not isinstance(operations, list) or not operations:
+            raise ValueError("Batch must be a non-empty list of operations.")
+        for index, operation in enumerate(operations):
+            if not isinstance(operation, dict) or operation.get("op") not in ("create", "update", "put", "delete"):
+                raise ValueError(f"Operation {index}: 'op' must be 'create', 'update', 'put' or 'delete'.")
+            if not isinstance(operation.get("type"), str):
+                raise ValueError(f"Operation {index}: needs a string 'type'.")
+            if operation["op"] in ("update", "delete") and not isinstance(operation.get("id"), str):
+                raise ValueError(f"Operation {index}: '{operation['op']}' needs a string 'id'.")
+            if operation["op"] != "delete" and (not isinstance(operation.get("data"), dict) or not operation["data"]):
+                raise ValueError(f"Operation {index}: '{operation['op']}' needs a non-empty 'data' object.")
+        with data_lock.write():
+            collections = self._current()
+            deleted, put = set(), set() # (type, id) removed / stored earlier in this batch
+            for index, operation in enumerate(operations):
+                entity_type = operation.get("type")
+                if entity_type not in collections:
+                    raise ValueError(f"Operation {index}: entity type '{entity_type}' not found.")
+                if operation["op"] == "put" and self._keeps_id(operation["data"]):
+                    key = (entity_type, operation["data"]["id"])
+                    put.add(key)
+                    deleted.discard(key)
+                if operation["op"] not in ("update", "delete"):
+                    continue
+                key = (entity_type, operation["id"])
+                if key in deleted or (key not in put and operation["id"] not in collections[entity_type]):
+                    raise ValueError(f"Operation {index}: item with ID '{operation['id']}' not found in '{entity_type}'.")
+                if operation["op"] == "delete":
+                    deleted.add(key)
+                    put.discard(key)
+            ops, results = [], []
+            try:
+                for operation in operations:
+                    entity_type = operation["type"]
+                    collection = collections[entity_type]
+                    if operation["op"] in ("create", "put"):
+                        item = dict(operation["data"])
+                        if operation["op"] == "create" or not self._keeps_id(item):
+                            item['id'] = collection.next_id()
+                        if item['id'] in collection:
+                            collection.replace(item['id'], item)
+                        else:
+                            collection.append(item)
+                    elif operation["op"] == "update":
+                        item = {**collection.get(operation["id"]), **operation["data"], 'id': operation["id"]}
+                        collection.replace(operation["id"], item)
+                    else:
+                        collection.remove(operation["id"])
+                        ops.append({"op": "delete", "type": entity_type, "id": operation["id"]})
+                        results.append({"id": operation["id"]})
+                        continue
+                    ops.append({"op": "put", "type": entity_type, "item": item})
+                    results.append(item)
+            except Exception:
+                # Part of the batch is applied in memory only; force a reload so memory matches disk again.
+                self.collections = None
+                raise
+            version = self._persist(ops)
+        self._sync(version)
+        return results
+
+
+store = DataStore(DATA_FILE, JOURNAL_FILE)
+
+def load_data():
+    """Returns the resident data. Treat it as read-only; mutate through `store`."""
+    return store.snapshot()
+
+def write_data_file(data_to_save, path=DATA_FILE):
+    """Writes data_to_save to a temp file next to path and fsyncs it. Returns the temp path, or None on failure."""
+    with SAVE_DATA_SECONDS.time():
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
                 json.dump(data_to_save, f, indent=2, ensure_ascii=False)
-            return True
+                f.flush()
+                os.fsync(f.fileno())
+            return tmp_path
         except IOError as e:
-            print(f"Error saving data to {DATA_FILE}: {e}")
-            return False
+            logger.error("Error saving data to %s: %s", path, e)
+            return None
         except Exception as e:
-            print(f"An unexpected error occurred during saving: {e}")
-            return False
+            logger.exception("An unexpected error occurred during saving: %s", e)
+            return None
+
+def fsync_directory(path):
+    """Makes a rename into path's directory durable."""
+    try:
+        dir_fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+    except OSError:
+        pass # Not supported on every platform (e.g. Windows)
+
+def save_data(data_to_save, path=DATA_FILE):
+    """Atomically replaces path with data_to_save (temp file + fsync + rename)."""
+    tmp_path = write_data_file(data_to_save, path)
+    if tmp_path is None:
+        return False
+    try:
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.error("Error saving data to %s: %s", path, e)
+        return False
+    fsync_directory(path)
+    return True
+
+# --- Backups ---
+class BackupManager:
+    """Takes hourly backups of the store from a background thread.
+
+    The first backup of each day (and the first after a restart) is a full
+    gzip-compressed snapshot; later hours only store a delta of changed and
+    deleted items against the previous backup. Whole days older than
+    retention_days are pruned, so every remaining delta chain still starts
+    at a full snapshot. Hours without changes produce no file.
+    """
 
-# --- ID Generation (Unchanged) ---
+    def __init__(self, data_store, backup_dir=BACKUP_DIR, retention_days=BACKUP_RETENTION_DAYS):
+        self.store = data_store
+        self.backup_dir = backup_dir
+        self.retention_days = retention_days
+        self.stem = os.path.splitext(os.path.basename(data_store.path))[0]
+        self._last_name = None
+        self._last_day = None
+        self._last_version = None
+        self._fingerprints = None # type -> {id: item hash}, or the hash of the whole list for types with unkeyed items
+
+    @staticmethod
+    def _fingerprint(data):
+        fingerprints = {}
+        for entity_type, items in data.items():
+            ids = [item.get("id") if isinstance(item, dict) else None for item in items]
+            if all(isinstance(item_id, str) for item_id in ids) and len(set(ids)) == len(ids):
+                fingerprints[entity_type] = {item_id: hash(json.dumps(item, sort_keys=True)) for item_id, item in zip(ids, items)}
+            else:
+                fingerprints[entity_type] = hash(json.dumps(items, sort_keys=True))
+        return fingerprints
+
+    def _delta(self, data, fingerprints):
+        ops, replaced_types = [], {}
+        for entity_type, current in fingerprints.items():
+            previous = self._fingerprints.get(entity_type)
+            if isinstance(current, dict) and isinstance(previous, dict):
+                items = {item["id"]: item for item in data[entity_type]}
+                ops.extend({"op": "put", "type": entity_type, "item": items[item_id]}
+                           for item_id, item_hash in current.items() if previous.get(item_id) != item_hash)
+                ops.extend({"op": "delete", "type": entity_type, "id": item_id}
+                           for item_id in previous if item_id not in current)
+            elif current != previous:
+                replaced_types[entity_type] = data[entity_type]
+        return {"kind": "delta", "base": self._last_name, "ops": ops, "types": replaced_types}
+
+    def backup_now(self, now=None):
+        """Writes this hour's backup unless it exists or nothing changed. Returns the file name or None."""
+        now = now or datetime.now()
+        hour = now.strftime('%Y-%m-%d-%H')
+        if self._last_name and self._last_name.startswith(f"{self.stem}.{hour}."):
+            return None
+        with self.store.read_collections() as collections: # One read, so the version describes exactly this data
+            version = self.store.version
+            data = {entity_type: collection.as_list() for entity_type, collection in collections.items()}
+        if version == self._last_version:
+            return None
+        fingerprints = self._fingerprint(data)
+        day = now.date()
+        if self._fingerprints is None or self._last_day != day:
+            kind, payload = "full", {"kind": "full", "data": data}
+        else:
+            kind, payload = "delta", self._delta(data, fingerprints)
+        payload["taken_at"] = now.isoformat(timespec='seconds')
+        name = f"{self.stem}.{hour}.{kind}.json.gz"
+        os.makedirs(self.backup_dir, exist_ok=True)
+        tmp_path = os.path.join(self.backup_dir, name + ".tmp")
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            json.dump(payload, f, ensure_ascii=False)
+        os.replace(tmp_path, os.path.join(self.backup_dir, name))
+        self._last_name, self._last_day, self._last_version, self._fingerprints = name, day, version, fingerprints
+        logger.info("Backup created: %s", os.path.join(self.backup_dir, name))
+        self.prune(now)
+        return name
+
+    def prune(self, now=None):
+        """Deletes backups from days older than retention_days."""
+        cutoff = ((now or datetime.now()) - timedelta(days=self.retention_days)).strftime('%Y-%m-%d')
+        for name, hour in list_backups(self.backup_dir, self.stem):
+            if hour[:10] < cutoff:
+                os.remove(os.path.join(self.backup_dir, name))
+
+    def run(self, interval=BACKUP_CHECK_SECONDS):
+        while True:
+            try:
+                self.backup_now()
+            except Exception as e:
+                logger.exception("Error during backup creation: %s", e)
+            time.sleep(interval)
+
+    def start(self):
+        thread = threading.Thread(target=self.run, name="backups", daemon=True)
+        thread.start()
+        return thread
+
+def list_backups(backup_dir, stem):
+    """Returns (file name, 'YYYY-MM-DD-HH') pairs for the backups of stem, oldest first.
+
+    An hour can have both a delta and a full snapshot if the server restarted
+    after its backup; the snapshot was taken by the restarted server, so it
+    sorts last.
+    """
+    pattern = re.compile(re.escape(stem) + r"\.(\d{4}-\d{2}-\d{2}-\d{2})\.(full|delta)\.json\.gz$")
+    try:
+        names = os.listdir(backup_dir)
+    except FileNotFoundError:
+        return []
+    matches = sorted((match.group(1), match.group(2) == "full", name) for name in names for match in [pattern.match(name)] if match)
+    return [(name, hour) for hour, _, name in matches]
+
+def restore_backup(point, backup_dir=BACKUP_DIR, stem=None):
+    """Rebuilds the data as of hour `point` ('YYYY-MM-DD-HH') from the backup chain.
+
+    Uses the newest backup taken at or before that hour and replays its
+    deltas on top of the full snapshot they start from.
+    """
+    stem = stem or os.path.splitext(os.path.basename(DATA_FILE))[0]
+    candidates = [name for name, hour in list_backups(backup_dir, stem) if hour <= point]
+    if not candidates:
+        raise FileNotFoundError(f"No backup of {stem} at or before {point} in {backup_dir}")
+    chain = []
+    name = candidates[-1]
+    while name:
+        with gzip.open(os.path.join(backup_dir, name), 'rt', encoding='utf-8') as f:
+            payload = json.load(f)
+        chain.append(payload)
+        name = payload.get("base") if payload["kind"] == "delta" else None
+    collections = {entity_type: EntityCollection(entity_type, items) for entity_type, items in chain.pop()["data"].items()}
+    for delta in reversed(chain):
+        for entity_type, items in delta["types"].items():
+            collections[entity_type] = EntityCollection(entity_type, items)
+        for op in delta["ops"]:
+            apply_journal_op(collections, op)
+    return {entity_type: collection.as_list() for entity_type, collection in collections.items()}
+
+# --- ID Generation ---
 def generate_next_id(entity_type_key, current_data):
-    # ... (keep existing generate_next_id function) ...
-    if entity_type_key not in current_data or not current_data[entity_type_key]:
-        prefix_map = {
-            "stakeholders": "STK", "goals_and_objectives": "GOAL", "business_processes": "BP",
-            "requirements": "REQ", "systems_and_applications": "SYS", "data_entities": "DE",
-            "risks_and_constraints": "RISK", "metrics_and_kpis": "KPI"
-        }
-        prefix = prefix_map.get(entity_type_key, entity_type_key[:3].upper())
-        return f"{prefix}_1"
-    max_num = 0
-    prefix = ""
-    # Updated regex to optionally match an underscore between prefix and number
-    id_pattern = re.compile(r"([a-zA-Z]+)_?(\d+)")
-    for item in current_data[entity_type_key]:
-        item_id = item.get("id", "")
-        match = id_pattern.match(item_id)
-        if match:
-            current_prefix = match.group(1)
-            current_num = int(match.group(2))
-            if not prefix: prefix = current_prefix
-            if current_prefix == prefix: max_num = max(max_num, current_num)
-        elif not prefix and item_id: prefix = ''.join(filter(str.isalpha, item_id)) or entity_type_key[:3].upper()
-    if not prefix:
-        prefix_map = {"stakeholders": "STK", "goals_and_objectives": "GOAL", "business_processes": "BP", "requirements": "REQ", "systems_and_applications": "SYS", "data_entities": "DE", "risks_and_constraints": "RISK", "metrics_and_kpis": "KPI"}
-        prefix = prefix_map.get(entity_type_key, entity_type_key[:3].upper())
-    next_num = max_num + 1
-    return f"{prefix}_{next_num}"
+    """Next ID for a list of items. The store itself uses EntityCollection.next_id(), which is O(1)."""
+    return EntityCollection(entity_type_key, current_data.get(entity_type_key) or []).next_id()
 
 
 # --- NEW: RTF Generation Logic ---
+# Backslash, braces and anything outside ASCII need escaping; everything else is copied as-is.
+RTF_SPECIAL_CHARS = re.compile(r'[\\{}\u0080-\U0010ffff]')
+RTF_CHUNK_SIZE = 64 * 1024 # Bytes buffered per chunk when streaming an export
+
+def _escape_rtf_char(match):
+    char = match.group()
+    if char in '\\{}':
+        return '\\' + char
+    # Use \uXXXX? format for RTF
+    # The '?' is a placeholder for characters not representable in the target codepage
+    return f'\\u{ord(char)}?'
+
 def escape_rtf(text):
     """Escapes characters special to RTF."""
     if text is None:
         return ""
-    text = str(text)
-    # Escape backslashes, curly braces first
-    text = text.replace('\\', '\\\\')
-    text = text.replace('{', '\\{')
-    text = text.replace('}', '\\}')
-    # Convert unicode characters outside basic range to \uXXXX? format
-    # This is a simplified approach; full unicode support is complex in RTF
-    encoded = []
-    for char in text:
-        codepoint = ord(char)
-        if codepoint < 128: # Basic ASCII
-             encoded.append(char)
-        else:
-             # Use \uXXXX? format for RTF
-             # The '?' is a placeholder for characters not representable in the target codepage
-             encoded.append(f'\\u{codepoint}?')
-    return "".join(encoded)
+    # A single regex pass in C; plain ASCII text comes back untouched
+    return RTF_SPECIAL_CHARS.sub(_escape_rtf_char, str(text))
 
 def generate_rtf_recursive(data, indent_level=0):
-    """Recursively generates RTF fragment for JSON data."""
-    rtf_str = ""
+    """Recursively yields RTF fragments for JSON data."""
     indent = '\\li' + str(indent_level * 720) + '\\fi-' + str(indent_level * 720) + ' ' # 720 twips = 0.5 inch approx
 
     if isinstance(data, dict):
         for key, value in data.items():
-            rtf_str += f"\\pard {indent} \\b {escape_rtf(key)}:\\b0 " # Bold key
+            yield f"\\pard {indent} \\b {escape_rtf(key)}:\\b0 " # Bold key
             if isinstance(value, (dict, list)):
-                rtf_str += "\\par\n" # Newline before nested structure
-                rtf_str += generate_rtf_recursive(value, indent_level + 1)
+                yield "\\par\n" # Newline before nested structure
+                yield from generate_rtf_recursive(value, indent_level + 1)
             else:
                  # Add value on the same line after a tab, if simple
-                 rtf_str += f"\\tab {escape_rtf(value)}\\par\n" # Value and paragraph end
+                 yield f"\\tab {escape_rtf(value)}\\par\n" # Value and paragraph end
     elif isinstance(data, list):
         for index, item in enumerate(data):
              # Add a bullet point or index before the item
-             rtf_str += f"\\pard {indent} \\bullet Item {index + 1}:\\par\n"
+             yield f"\\pard {indent} \\bullet Item {index + 1}:\\par\n"
              # Increase indent for item content
-             rtf_str += generate_rtf_recursive(item, indent_level + 1)
-             rtf_str += "\\par\n" # Extra space between list items
+             yield from generate_rtf_recursive(item, indent_level + 1)
+             yield "\\par\n" # Extra space between list items
     else:
         # Should not happen if top level is dict, but handle just in case
-        rtf_str += f"\\pard {indent} {escape_rtf(data)}\\par\n"
+        yield f"\\pard {indent} {escape_rtf(data)}\\par\n"
 
-    return rtf_str
-
-def generate_rtf(data):
-    """Generates a complete RTF document string from the data."""
+def generate_rtf_fragments(data):
+    """Yields a complete RTF document as string fragments, without building it in memory."""
     # RTF Header
     header = "{\\rtf1\\ansi\\deff0\\nouicompat"
     header += "{\\fonttbl{\\f0 Arial;}{\\f1 Courier New;}}" # Font table: f0=Arial, f1=Courier
     # Basic Color Table (optional) - Black, Red, Green, Blue
     # header += "{\\colortbl ;\\red0\\green0\\blue0;\\red255\\green0\\blue0;\\red0\\green255\\blue0;\\red0\\green0\\blue255;}"
     header += "\\pard\\sa200\\sl276\\slmult1\\f0\\fs24\n" # Default paragraph, font 0 (Arial), size 12pt (24 half-points)
+    yield header
 
     # RTF Body generated recursively
-    body = generate_rtf_recursive(data)
+    yield from generate_rtf_recursive(data)
 
     # RTF Footer
-    footer = "\n}"
+    yield "\n}"
+
+def generate_rtf(data):
+    """Generates a complete RTF document string from the data."""
+    return "".join(generate_rtf_fragments(data))
+
+def encode_chunks(fragments, chunk_size=RTF_CHUNK_SIZE, encoding='ascii'):
+    """Joins string fragments into byte chunks of roughly chunk_size.
+
+    The ASCII default (dropping anything else) suits RTF, which escapes
+    non-ASCII text itself.
+    """
+    pending, pending_len = [], 0
+    for fragment in fragments:
+        pending.append(fragment)
+        pending_len += len(fragment)
+        if pending_len >= chunk_size:
+            yield "".join(pending).encode(encoding, errors='ignore')
+            pending, pending_len = [], 0
+    if pending:
+        yield "".join(pending).encode(encoding, errors='ignore')
+
+# --- NDJSON Import/Export ---
+NDJSON_IMPORT_BATCH = 1000 # Lines applied (and journaled) per transaction on import
+
+def generate_ndjson_lines(data, entity_types=None):
+    """Yields one '{"type": ..., "item": ...}' line per entity, optionally only for entity_types."""
+    for entity_type, items in data.items():
+        if entity_types and entity_type not in entity_types:
+            continue
+        for item in items:
+            yield json.dumps({"type": entity_type, "item": item}, ensure_ascii=False) + "\n"
+
+def import_ndjson_lines(lines, data_store, batch_size=NDJSON_IMPORT_BATCH):
+    """Upserts entities from an iterable of NDJSON lines (bytes or str).
 
-    return header + body + footer
+    Lines are parsed as they arrive and applied batch_size at a time, each
+    batch as one transaction, so memory stays bounded whatever the input size.
+    Items with an ID replace or insert that item; items without one are
+    created. Returns the number of entities imported. A bad line raises
+    ValueError; the batches before it stay applied.
+    """
+    known_types = set(data_store.entity_types())
+    imported, batch = 0, []
+    def flush():
+        nonlocal imported, batch
+        if batch:
+            data_store.apply_batch(batch)
+            imported += len(batch)
+            batch = []
+    for line_number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            entry = json.loads(line)
+        except ValueError as e:
+            flush()
+            raise ValueError(f"Line {line_number}: invalid JSON ({e}); {imported} entities imported before it.") from e
+        if (not isinstance(entry, dict) or entry.get("type") not in known_types
+                or not isinstance(entry.get("item"), dict) or not entry["item"]):
+            flush()
+            raise ValueError(f"Line {line_number}: expected {{\"type\": <entity type>, \"item\": {{...}}}}; "
+                             f"{imported} entities imported before it.")
+        batch.append({"op": "put", "type": entry["type"], "data": entry["item"]})
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+    return imported
+
+# --- Semantic Search ---
+class HashingEmbedder:
+    """Deterministic, dependency-free embedder used when no model is available.
+
+    Words and character trigrams are hashed into signed buckets (the
+    "hashing trick") and the vector is L2-normalised. It is lexical rather
+    than semantic, but needs no download and yields identical vectors on
+    every machine.
+    """
+
+    def __init__(self, dim=256):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    @staticmethod
+    def _features(text):
+        for word in re.findall(r"\w+", text.lower()):
+            yield word, 1.0
+            padded = f"#{word}#"
+            for i in range(len(padded) - 2):
+                yield padded[i:i + 3], 0.5
+
+    def embed(self, texts):
+        vectors = []
+        for text in texts:
+            vector = [0.0] * self.dim
+            for feature, weight in self._features(text):
+                h = zlib.crc32(feature.encode('utf-8'))
+                vector[h % self.dim] += weight if h & 0x80000000 else -weight
+            norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+            vectors.append([v / norm for v in vector])
+        return vectors
+
+class SentenceTransformerEmbedder:
+    """all-MiniLM-L6-v2 (the model the browser used to load) via the optional sentence-transformers package."""
+
+    def __init__(self, model_name="sentence-transformers/all-MiniLM-L6-v2"):
+        from sentence_transformers import SentenceTransformer # Optional dependency
+        self._model = SentenceTransformer(model_name)
+        self.dim = self._model.get_sentence_embedding_dimension()
+        self.name = model_name
+
+    def embed(self, texts):
+        return [[float(v) for v in vector] for vector in self._model.encode(list(texts), normalize_embeddings=True)]
+
+# Embedders selectable with REQAI_EMBEDDER. Each must expose `name`, `dim` and
+# `embed(texts) -> list of L2-normalised vectors`.
+EMBEDDERS = {
+    "hashing": HashingEmbedder,
+    "minilm": SentenceTransformerEmbedder,
+}
+
+def make_embedder(key=EMBEDDER):
+    try:
+        return EMBEDDERS[key]()
+    except Exception as e: # Unknown key, missing package, or a model that cannot be loaded (e.g. offline)
+        logger.warning("Embedder '%s' unavailable (%r); falling back to hashing embedder.", key, e)
+        return HashingEmbedder()
+
+
+class MappedMatrix:
+    """A growable float32 matrix backed by a memory-mapped file.
+
+    Rows are written in place, so saving is a flush and a restart maps the
+    existing file instead of reading it. Growing remaps the file, so no view
+    from row() or as_numpy() may be alive across ensure_rows().
+    """
+
+    def __init__(self, path, dim):
+        self.path = path
+        self.dim = dim
+        self.row_bytes = 4 * dim
+        self._file = open(path, 'a+b') # Creates the file if missing, never truncates it
+        self.capacity = os.fstat(self._file.fileno()).st_size // self.row_bytes
+        self._mmap = None
+        self._view = None
+        if self.capacity:
+            self._map()
+
+    def _map(self):
+        self._mmap = mmap.mmap(self._file.fileno(), self.capacity * self.row_bytes)
+        self._view = memoryview(self._mmap).cast('f')
+
+    def _unmap(self):
+        if self._mmap is not None:
+            self._view.release()
+            self._mmap.close()
+            self._mmap = self._view = None
+
+    def ensure_rows(self, n_rows):
+        if n_rows <= self.capacity:
+            return
+        self._unmap()
+        self.capacity = max(n_rows, 2 * self.capacity, 64)
+        self._file.truncate(self.capacity * self.row_bytes)
+        self._map()
+
+    def row(self, i):
+        return self._view[i * self.dim:(i + 1) * self.dim]
+
+    def set_row(self, i, vector):
+        self._view[i * self.dim:(i + 1) * self.dim] = array('f', vector)
+
+    def as_numpy(self, n_rows):
+        """A zero-copy (n_rows, dim) NumPy view; drop it before the matrix may grow."""
+        if not n_rows:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.frombuffer(self._mmap, dtype=np.float32, count=n_rows * self.dim).reshape(n_rows, self.dim)
+
+    def flush(self):
+        if self._mmap is not None:
+            self._mmap.flush()
+
+
+class IVFIndex:
+    """Inverted-file approximate nearest-neighbour index over matrix rows (needs NumPy).
+
+    Rows are clustered around nlist centroids with spherical k-means, and a
+    query only scores the rows of its nprobe most similar clusters. nprobe
+    trades recall for latency (nprobe == nlist is exact). Inserts and deletes
+    only update a row's cluster assignment.
+    """
+
+    def __init__(self, dim):
+        self.dim = dim
+        self.centroids = None # (nlist, dim) float32
+        self.assignment = np.empty(0, dtype=np.int32) # row -> cluster, -1 when unassigned
+        self.trained_rows = 0
+
+    @property
+    def nlist(self):
+        return 0 if self.centroids is None else len(self.centroids)
+
+    def _nearest(self, vectors, chunk=8192):
+        return np.concatenate([np.argmax(vectors[i:i + chunk] @ self.centroids.T, axis=1)
+                               for i in range(0, len(vectors), chunk)] or [np.empty(0, dtype=np.int64)])
+
+    def train(self, matrix, live_rows, nlist=0, iterations=8, seed=0):
+        """Clusters the live rows of matrix and assigns every one of them."""
+        rng = np.random.default_rng(seed)
+        nlist = min(nlist or max(1, int(math.sqrt(len(live_rows)))), len(live_rows))
+        sample = matrix[rng.choice(live_rows, size=min(len(live_rows), 64 * nlist), replace=False)]
+        centroids = sample[rng.choice(len(sample), size=nlist, replace=False)]
+        for _ in range(iterations):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            norms = np.linalg.norm(sums, axis=1)
+            empty = norms == 0
+            if empty.any(): # Re-seed clusters that lost every member
+                sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()))]
+                norms[empty] = np.linalg.norm(sums[empty], axis=1)
+            centroids = sums / np.maximum(norms, 1e-12)[:, None]
+        self.centroids = centroids.astype(np.float32)
+        self.assignment = np.full(len(matrix), -1, dtype=np.int32)
+        self.assignment[live_rows] = self._nearest(matrix[live_rows])
+        self.trained_rows = len(live_rows)
+
+    def assign(self, row, vector):
+        if row >= len(self.assignment):
+            grown = np.full(max(row + 1, 2 * len(self.assignment)), -1, dtype=np.int32)
+            grown[:len(self.assignment)] = self.assignment
+            self.assignment = grown
+        self.assignment[row] = self._nearest(np.asarray(vector, dtype=np.float32)[None, :])[0]
+
+    def remove(self, row):
+        if row < len(self.assignment):
+            self.assignment[row] = -1
+
+    def candidates(self, query_vector, nprobe):
+        """Rows in the nprobe clusters closest to query_vector."""
+        nprobe = min(max(1, nprobe), self.nlist)
+        probe = np.argpartition(-(self.centroids @ query_vector), nprobe - 1)[:nprobe]
+        probed = np.zeros(self.nlist + 1, dtype=bool) # The extra last slot is what -1 (unassigned) indexes
+        probed[probe] = True
+        return np.flatnonzero(probed[self.assignment])
+
+    def save(self, path):
+        with open(path + ".tmp", 'wb') as f:
+            self.centroids.tofile(f)
+            self.assignment.tofile(f)
+        os.replace(path + ".tmp", path)
+
+    def load(self, path, nlist, trained_rows):
+        data = np.fromfile(path, dtype=np.float32)
+        self.centroids = data[:nlist * self.dim].reshape(nlist, self.dim).copy()
+        self.assignment = data[nlist * self.dim:].view(np.int32).copy()
+        self.trained_rows = trained_rows
+
+
+class EmbeddingIndex:
+    """Persistent embeddings of requirement descriptions, served by /api/search.
+
+    Vectors live in a memory-mapped float32 matrix (MappedMatrix), so NumPy
+    (when installed) scores rows with a single matrix-vector product; without
+    it a pure-Python loop is used. Past ANN_MIN_ROWS rows, and with NumPy, an
+    IVFIndex narrows each query to a few clusters first. Once attached to the
+    store, every committed mutation is queued and a background worker
+    re-embeds only the rows whose description hash changed, so writes never
+    wait on embedding.
+    """
+
+    ENTITY_TYPE = "requirements"
+    SAVE_DELAY_SECONDS = 5 # Batch index saves instead of rewriting the file per change
+
+    def __init__(self, embedder, path=EMBEDDINGS_FILE):
+        self.embedder = embedder
+        self.dim = embedder.dim
+        self.path = path
+        self.meta_path = path + ".json"
+        self.ivf_path = path + ".ivf"
+        self.ids = [] # row -> requirement id, None for a free row
+        self.hashes = [] # row -> hash of the embedded text
+        self.rows = {} # requirement id -> row
+        # Rows freed since the last save stay out of free_rows until it has
+        # recorded them as free: until then the saved metadata still points at them.
+        self.free_rows = []
+        self._freed_since_save = []
+        self.ann = None # IVFIndex once there are enough rows
+        self._lock = ReadWriteLock("search_index") # Searches read; only the worker writes
+        self._queue = queue.Queue()
+        self._dirty = False
+        self._load()
+
+    @staticmethod
+    def text_of(item):
+        return str(item.get("description") or "").strip()
+
+    @staticmethod
+    def content_hash(text):
+        return hashlib.blake2b(text.encode('utf-8'), digest_size=8).hexdigest()
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _load(self):
+        meta = None
+        try:
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta["embedder"] != self.embedder.name:
+                meta = None # Vectors from another model are useless
+        except (OSError, ValueError, KeyError):
+            meta = None
+        if meta is None and os.path.exists(self.path):
+            os.remove(self.path)
+        self.matrix = MappedMatrix(self.path, self.dim)
+        if meta is None or len(meta["ids"]) > self.matrix.capacity:
+            return
+        self.ids, self.hashes = meta["ids"], meta["hashes"]
+        self.rows = {item_id: row for row, item_id in enumerate(self.ids) if item_id is not None}
+        self.free_rows = [row for row, item_id in enumerate(self.ids) if item_id is None]
+        if np is not None and meta.get("ivf"):
+            try:
+                self.ann = IVFIndex(self.dim)
+                self.ann.load(self.ivf_path, meta["ivf"]["nlist"], meta["ivf"]["trained_rows"])
+            except (OSError, ValueError):
+                self.ann = None
+
+    def _save(self):
+        with self._lock.read():
+            self._dirty = False
+            self.matrix.flush()
+            meta = {"embedder": self.embedder.name, "dim": self.dim, "ids": list(self.ids), "hashes": list(self.hashes)}
+            ann = self.ann
+            if ann is not None:
+                meta["ivf"] = {"nlist": ann.nlist, "trained_rows": ann.trained_rows}
+                ann.save(self.ivf_path)
+            freed = self._freed_since_save
+            self._freed_since_save = []
+        try:
+            with open(self.meta_path + ".tmp", 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
+            os.replace(self.meta_path + ".tmp", self.meta_path)
+        except OSError as e:
+            logger.error("Error saving embedding index to %s: %s", self.meta_path, e)
+            freed = [] # Not recorded as free on disk: never reuse them this run
+        with self._lock.write():
+            self.free_rows.extend(freed)
+
+    # --- Keeping up with the store ---
+    def attach(self, data_store):
+        """Queues a full resync against data_store, then follows its mutations in a worker thread."""
+        data_store.add_listener(self._on_change)
+        self._queue.put(None)
+        thread = threading.Thread(target=self._run, args=(data_store,), name="search-index", daemon=True)
+        thread.start()
+        return thread
+
+    def _on_change(self, version, ops):
+        # Runs under the store's write lock: only enqueue here.
+        if ops is None:
+            self._queue.put(None) # Reloaded from disk: anything may have changed
+            return
+        relevant = [op for op in ops if op["type"] == self.ENTITY_TYPE]
+        if relevant:
+            self._queue.put(relevant)
+
+    def _run(self, data_store):
+        last_save = time.monotonic()
+        while True:
+            try:
+                work = [self._queue.get(timeout=self.SAVE_DELAY_SECONDS)]
+                while not self._queue.empty(): # Coalesce whatever piled up meanwhile
+                    work.append(self._queue.get_nowait())
+            except queue.Empty:
+                work = []
+            try:
+                if any(ops is None for ops in work):
+                    self.resync(data_store) # The store already reflects every queued op
+                elif work:
+                    self.apply_ops([op for ops in work for op in ops])
+                self._maybe_train()
+                if self._dirty and (not work or time.monotonic() - last_save >= self.SAVE_DELAY_SECONDS):
+                    self._save()
+                    last_save = time.monotonic()
+            except Exception as e:
+                logger.exception("Error updating search index: %s", e)
+            finally:
+                for _ in work:
+                    self._queue.task_done()
+
+    def wait_until_current(self):
+        """Blocks until every queued change has been indexed."""
+        self._queue.join()
+
+    def resync(self, data_store):
+        """Reconciles the index with the whole store, embedding only new or changed descriptions."""
+        upserts = {}
+        for item in data_store.list_items(self.ENTITY_TYPE) or []:
+            text = self.text_of(item)
+            if text and isinstance(item.get("id"), str):
+                upserts[item["id"]] = (self.content_hash(text), text)
+        self._apply(upserts, [item_id for item_id in self.rows if item_id not in upserts])
+
+    def apply_ops(self, ops):
+        """Applies journal-style put/delete ops for requirements."""
+        latest = {} # id -> last op for it
+        for op in ops:
+            item_id = op["item"]["id"] if op["op"] == "put" else op["id"]
+            latest[item_id] = op
+        upserts, removals = {}, []
+        for item_id, op in latest.items():
+            text = self.text_of(op["item"]) if op["op"] == "put" else ""
+            if text:
+                upserts[item_id] = (self.content_hash(text), text)
+            else:
+                removals.append(item_id) # Deleted, or description cleared
+        self._apply(upserts, removals)
+
+    def _apply(self, upserts, removals):
+        """Embeds changed texts without holding the lock, then writes them into their rows."""
+        changed = [(item_id, content_hash, text) for item_id, (content_hash, text) in upserts.items()
+                   if item_id not in self.rows or self.hashes[self.rows[item_id]] != content_hash]
+        removals = [item_id for item_id in removals if item_id in self.rows]
+        if not changed and not removals:
+            return
+        vectors = self.embedder.embed([text for _, _, text in changed]) if changed else []
+        with self._lock.write():
+            for item_id in removals:
+                row = self.rows.pop(item_id)
+                self.ids[row] = self.hashes[row] = None
+                self._freed_since_save.append(row)
+                if self.ann is not None:
+                    self.ann.remove(row)
+            new_rows = sum(1 for item_id, _, _ in changed if item_id not in self.rows)
+            self.matrix.ensure_rows(len(self.ids) + new_rows)
+            for (item_id, content_hash, _), vector in zip(changed, vectors):
+                row = self.rows.get(item_id)
+                if row is None:
+                    if self.free_rows:
+                        row = self.free_rows.pop()
+                    else:
+                        row = len(self.ids)
+                        self.ids.append(None)
+                        self.hashes.append(None)
+                    self.rows[item_id] = row
+                self.matrix.set_row(row, vector)
+                self.ids[row], self.hashes[row] = item_id, content_hash
+                if self.ann is not None:
+                    self.ann.assign(row, vector)
+            self._dirty = True
+
+    def _maybe_train(self):
+        """(Re)builds the IVF index once there are ANN_MIN_ROWS rows, and again whenever they double."""
+        if np is None or len(self.rows) < ANN_MIN_ROWS:
+            return
+        if self.ann is not None and len(self.rows) < 2 * self.ann.trained_rows:
+            return
+        # Only this worker thread writes rows, so reading them without the lock is safe.
+        live_rows = np.fromiter(self.rows.values(), dtype=np.int64, count=len(self.rows))
+        ann = IVFIndex(self.dim)
+        ann.train(self.matrix.as_numpy(len(self.ids)), live_rows, nlist=ANN_NLIST)
+        with self._lock.write():
+            self.ann = ann
+            self._dirty = True
+        logger.info("Search index: trained IVF with %d clusters over %d rows.", ann.nlist, ann.trained_rows)
+
+    # --- Queries ---
+    def search(self, query, k, nprobe=ANN_NPROBE, exact=False):
+        """Returns up to k (requirement id, cosine similarity) pairs, best first.
+
+        Uses the IVF index when it exists unless exact is set; nprobe is the
+        number of clusters it scores.
+        """
+        query_vector = array('f', self.embedder.embed([query])[0])
+        with self._lock.read():
+            k = min(k, len(self.rows))
+            if k <= 0:
+                return []
+            n_rows = len(self.ids)
+            if np is not None:
+                q = np.frombuffer(query_vector, dtype=np.float32)
+                matrix = self.matrix.as_numpy(n_rows)
+                candidates = None
+                if self.ann is not None and not exact:
+                    candidates = self.ann.candidates(q, nprobe)
+                    candidates = candidates[candidates < n_rows]
+                    if len(candidates) < k:
+                        candidates = None # Too few rows in the probed clusters; score everything
+                if candidates is None:
+                    scores = matrix @ q
+                    if len(self.rows) < n_rows: # Free rows hold stale vectors
+                        scores[[row for row, item_id in enumerate(self.ids) if item_id is None]] = -np.inf
+                    candidates = np.arange(n_rows)
+                else:
+                    scores = matrix[candidates] @ q
+                del matrix # Release the buffer export so the worker may grow the matrix
+                top = np.argpartition(-scores, k - 1)[:k]
+                top = top[np.argsort(-scores[top])]
+                return [(self.ids[candidates[i]], float(scores[i])) for i in top]
+            ids, row_vector = self.ids, self.matrix.row
+            scores = ((sum(map(operator.mul, query_vector, row_vector(row))), row)
+                      for row in range(n_rows) if ids[row] is not None)
+            return [(ids[row], score) for score, row in heapq.nlargest(k, scores)]
+
+
+_search_index = None
+_search_index_lock = threading.Lock()
+
+def get_search_index():
+    """Returns the process-wide EmbeddingIndex, creating and attaching it to the store on first use."""
+    global _search_index
+    with _search_index_lock:
+        if _search_index is None:
+            _search_index = EmbeddingIndex(make_embedder())
+            _search_index.attach(store)
+        return _search_index
+
+# --- Entity Listing (filters, sorting, pagination) ---
+LIST_FILTERS = {"tag": "tags", "version": "version", "priority": "priority"} # Query parameter -> indexed item field
+PRIORITY_ORDER = {"Must Have": 1, "High Priority": 2, "Medium Priority": 3, "Low Priority": 4, "Cherry on the Cake": 5}
+LIST_QUERY_CACHE_SIZE = 64 # Filtered/sorted results kept per data version, so paging is a slice
+
+class FieldIndex:
+    """Secondary indexes over the filterable fields: value -> IDs of the items having it.
+
+    Kept current by a store listener (under the store's write lock), so a
+    filter is a set intersection instead of a scan. Items are indexed under
+    their collection key, so those without an ID, or repeating one, are
+    listed like any other. Elements of list fields
+    such as tags are indexed individually; values are compared as trimmed
+    strings, like the frontend filters. Ordered query results are cached per
+    store version, so every page after the first is a slice.
+    """
+
+    def __init__(self, fields=tuple(LIST_FILTERS.values())):
+        self.fields = fields
+        self._index = {} # (entity type, field) -> {value: set of collection keys}
+        self._indexed = {} # (entity type, key) -> {field: values}, to unindex on change
+        self._shadows = {} # (entity type, ID) -> private keys of items repeating it, removed along with it
+        self._cache = {} # query key -> ordered items
+        self._cache_version = None
+        self._cache_lock = threading.Lock()
+
+    def attach(self, data_store):
+        self.store = data_store
+        data_store.add_listener(self._on_change)
+        with data_lock.write():
+            self._rebuild(data_store._current())
+
+    @staticmethod
+    def values_of(item, field):
+        value = item.get(field)
+        values = value if isinstance(value, list) else [value]
+        return {str(v).strip() for v in values if v is not None and str(v).strip()}
+
+    def _add(self, entity_type, key, item):
+        indexed = {}
+        for field in self.fields:
+            values = self.values_of(item, field) if isinstance(item, dict) else set()
+            for value in values:
+                self._index.setdefault((entity_type, field), {}).setdefault(value, set()).add(key)
+            indexed[field] = values
+        self._indexed[(entity_type, key)] = indexed
+
+    def _remove(self, entity_type, key):
+        for field, values in self._indexed.pop((entity_type, key), {}).items():
+            if not values:
+                continue # Nothing was indexed, and the field's map may not exist yet
+            by_value = self._index[(entity_type, field)]
+            for value in values:
+                by_value[value].discard(key)
+                if not by_value[value]:
+                    del by_value[value]
+
+    def _rebuild(self, collections):
+        self._index, self._indexed, self._shadows = {}, {}, {}
+        for entity_type, collection in collections.items():
+            for key, item in collection.keyed_items():
+                item_id = item.get("id") if isinstance(item, dict) else None
+                if key != item_id and isinstance(item_id, str):
+                    self._shadows.setdefault((entity_type, item_id), []).append(key)
+                self._add(entity_type, key, item)
+
+    def _on_change(self, version, ops):
+        if ops is None:
+            self._rebuild(self.store.collections)
+            return
+        for op in ops:
+            if op["op"] == "put": # Stored under its ID, whether it replaced an item or was appended
+                self._remove(op["type"], op["item"]["id"])
+                self._add(op["type"], op["item"]["id"], op["item"])
+            else: # The collection drops the items repeating the ID too
+                self._remove(op["type"], op["id"])
+                for key in self._shadows.pop((op["type"], op["id"]), ()):
+                    self._remove(op["type"], key)
+
+    def _ordered(self, collection, entity_type, filters, sort):
+        """Items of collection matching every (field, value) in filters, in sort order. Caller holds the read lock."""
+        if filters:
+            by_field = [self._index.get((entity_type, field), {}).get(value, set()) for field, value in filters]
+            keys = sorted(set.intersection(*sorted(by_field, key=len)), key=collection.positions().__getitem__)
+            items = [collection.get(key) for key in keys]
+        else:
+            items = collection.as_list()
+        if sort:
+            field = sort.lstrip('-')
+            present = [item for item in items if item.get(field) not in (None, "")]
+            missing = [item for item in items if item.get(field) in (None, "")]
+            present.sort(key=lambda item: self.sort_key(field, item[field]), reverse=sort.startswith('-'))
+            items = present + missing # Items without the field always come last
+        return items
+
+    @staticmethod
+    def sort_key(field, value):
+        if field == "priority" and value in PRIORITY_ORDER:
+            return (0, PRIORITY_ORDER[value], "")
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return (1, value, "")
+        return (2, 0, str(value).lower())
+
+    def query(self, entity_type, filters=(), sort=None, cursor=None, limit=None):
+        """Returns (page of items, total matches, next cursor or None), or None if entity_type is unknown.
+
+        cursor is the opaque value returned with the previous page. It records
+        the position and the last ID served, so paging continues after that
+        item even if the data changed in between.
+        """
+        filters = tuple(sorted(filters))
+        with self.store.read_collections() as collections:
+            collection = collections.get(entity_type)
+            if collection is None:
+                return None
+            key = (entity_type, filters, sort)
+            if not filters and not sort:
+                items = collection.as_list()
+            else:
+                with self._cache_lock:
+                    if self._cache_version != self.store.version:
+                        self._cache, self._cache_version = {}, self.store.version
+                    items = self._cache.get(key)
+                if items is None:
+                    items = self._ordered(collection, entity_type, filters, sort)
+                    with self._cache_lock:
+                        if self._cache_version == self.store.version:
+                            if len(self._cache) >= LIST_QUERY_CACHE_SIZE:
+                                self._cache.pop(next(iter(self._cache)))
+                            self._cache[key] = items
+        start = self._resume(items, cursor) if cursor else 0
+        end = len(items) if limit is None else start + limit
+        page = items[start:end]
+        next_cursor = None
+        if end < len(items) and page:
+            last_id = page[-1].get('id')
+            last_id = last_id if isinstance(last_id, str) else "" # Items without an ID resume by position alone
+            next_cursor = base64.urlsafe_b64encode(f"{end}:{last_id}".encode('utf-8')).decode('ascii')
+        return page, len(items), next_cursor
+
+    @staticmethod
+    def _resume(items, cursor):
+        try:
+            offset, last_id = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').split(':', 1)
+            offset = int(offset)
+        except (ValueError, UnicodeError):
+            raise ValueError("Invalid cursor.")
+        if not last_id:
+            return min(max(offset, 0), len(items))
+        if 0 < offset <= len(items) and items[offset - 1].get("id") == last_id:
+            return offset # Nothing moved: the common case
+        for position, item in enumerate(items):
+            if item.get("id") == last_id:
+                return position + 1
+        return min(offset, len(items)) # Last item is gone: fall back to the position
+
+_field_index = None
+_field_index_lock = threading.Lock()
+
+def get_field_index():
+    """Returns the process-wide FieldIndex, creating and attaching it to the store on first use."""
+    global _field_index
+    with _field_index_lock:
+        if _field_index is None:
+            _field_index = FieldIndex()
+            _field_index.attach(store)
+        return _field_index
+
+# --- Reference Graph (links between entities) ---
+REFERENCE_FIELDS = { # Item field -> entity type its IDs refer to; "list.field" reads field from each element of list
+    "stakeholder_id": "stakeholders",
+    "owner": "stakeholders",
+    "source": "stakeholders",
+    "related_goal_id": "goals_and_objectives",
+    "related_process_id": "business_processes",
+    "solution_assessments.solution_id": "solutions",
+    "related_requirements": "requirements",
+    "related_systems": "systems_and_applications",
+    "related_goals": "goals_and_objectives",
+}
+
+class IntegrityError(Exception):
+    """A change would leave references to a missing item. `dependents` lists the referencing items."""
+
+    def __init__(self, message, dependents):
+        super().__init__(message)
+        self.dependents = dependents
+
+class ReferenceGraph:
+    """Adjacency index of the references between items, in both directions.
+
+    Kept current by a store listener (under the store's write lock), like
+    FieldIndex, and like it keyed by collection key, so the references of
+    items without an ID, or repeating one, are counted too. Each transaction
+    only touches the edges of the items it changed, and the set of referenced-but-missing items is maintained
+    alongside, so impact queries walk the edges and integrity checks read
+    that set instead of scanning the data.
+    """
+
+    def __init__(self, fields=REFERENCE_FIELDS):
+        self.fields = fields
+        self._outgoing = {} # (type, collection key) -> {(field, target type, target ID)}
+        self._incoming = {} # (target type, target ID) -> {(type, collection key, field)}
+        self._shadows = {} # (type, ID) -> private keys of items repeating it, removed along with it
+        self._missing = set() # Referenced (type, ID)s with no such item
+
+    def attach(self, data_store):
+        self.store = data_store
+        data_store.add_listener(self._on_change)
+        with data_lock.write():
+            self._rebuild(data_store._current())
+
+    def references_of(self, item):
+        """Yields (field, target type, target ID) for every reference an item holds."""
+        for field, target_type in self.fields.items():
+            field, _, subfield = field.partition('.')
+            value = item.get(field)
+            values = value if isinstance(value, list) else [value]
+            if subfield:
+                values = [element.get(subfield) for element in values if isinstance(element, dict)]
+            for target_id in values:
+                if isinstance(target_id, str) and target_id.strip():
+                    yield field, target_type, target_id.strip()
+
+    def _exists(self, collections, key):
+        collection = collections.get(key[0])
+        return collection is not None and key[1] in collection
+
+    def _add(self, entity_type, key, item):
+        edges = set(self.references_of(item)) if isinstance(item, dict) else set()
+        self._outgoing[(entity_type, key)] = edges
+        for field, target_type, target_id in edges:
+            self._incoming.setdefault((target_type, target_id), set()).add((entity_type, key, field))
+        return edges
+
+    def _remove(self, entity_type, key):
+        edges = self._outgoing.pop((entity_type, key), ())
+        for field, target_type, target_id in edges:
+            sources = self._incoming[(target_type, target_id)]
+            sources.discard((entity_type, key, field))
+            if not sources:
+                del self._incoming[(target_type, target_id)]
+        return edges
+
+    def _rebuild(self, collections):
+        self._outgoing, self._incoming, self._shadows = {}, {}, {}
+        for entity_type, collection in collections.items():
+            for key, item in collection.keyed_items():
+                item_id = item.get("id") if isinstance(item, dict) else None
+                if key != item_id and isinstance(item_id, str):
+                    self._shadows.setdefault((entity_type, item_id), []).append(key)
+                self._add(entity_type, key, item)
+        self._missing = {key for key in self._incoming if not self._exists(collections, key)}
+
+    def _on_change(self, version, ops):
+        collections = self.store.collections
+        if ops is None:
+            self._rebuild(collections)
+            return
+        touched = set() # Items whose existence or referrers may have changed
+        for op in ops:
+            if op["op"] == "put": # Stored under its ID, whether it replaced an item or was appended
+                key = (op["type"], op["item"]["id"])
+                edges = set(self._remove(*key)) | set(self._add(*key, op["item"]))
+            else: # The collection drops the items repeating the ID too
+                key = (op["type"], op["id"])
+                edges = set(self._remove(*key))
+                for shadow in self._shadows.pop(key, ()):
+                    edges |= set(self._remove(op["type"], shadow))
+            touched.add(key)
+            touched.update((target_type, target_id) for _, target_type, target_id in edges)
+        for key in touched:
+            if key in self._incoming and not self._exists(collections, key):
+                self._missing.add(key)
+            else:
+                self._missing.discard(key)
+
+    def _referrers(self, collections, target):
+        """Items referencing target as (type, collection key, ID, field), by type and then in data order."""
+        sources = sorted(self._incoming.get(target, ()),
+                         key=lambda source: (source[0], collections[source[0]].positions()[source[1]], source[2]))
+        return [(source_type, key, key if isinstance(key, str) else collections[source_type].get(key).get("id"), field)
+                for source_type, key, field in sources]
+
+    def dependents(self, entity_type, item_id):
+        """Direct referrers of an item as (type, ID, field) tuples. Caller holds data_lock.
+
+        Items without an ID, or repeating one, are included; the ID is theirs as stored.
+        """
+        return [(source_type, source_id, field)
+                for source_type, _, source_id, field in self._referrers(self.store.collections, (entity_type, item_id))]
+
+    def impact(self, entity_type, item_id, max_depth=None):
+        """Everything that depends on an item, directly or transitively, breadth first.
+
+        Returns None if the item does not exist. Each dependent is
+        {"type", "id", "name", "depth", "via": {"type", "id", "field"}}, where
+        via is the item it references (through field) one level closer.
+        """
+        with self.store.read_collections() as collections:
+            if not self._exists(collections, (entity_type, item_id)):
+                return None
+            seen, frontier, result, depth = {(entity_type, item_id)}, [(entity_type, item_id, item_id)], [], 0
+            while frontier and (max_depth is None or depth < max_depth):
+                depth += 1
+                next_frontier = []
+                for target_type, target_key, target_id in frontier:
+                    for source_type, source_key, source_id, field in self._referrers(collections, (target_type, target_key)):
+                        if (source_type, source_key) in seen:
+                            continue
+                        seen.add((source_type, source_key))
+                        next_frontier.append((source_type, source_key, source_id))
+                        result.append({"type": source_type, "id": source_id,
+                                       "name": collections[source_type].get(source_key).get("name"), "depth": depth,
+                                       "via": {"type": target_type, "id": target_id, "field": field}})
+                frontier = next_frontier
+            return result
+
+    def dangling(self):
+        """References to items that do not exist, as {"type", "id", "field", "target_type", "target_id"} dicts."""
+        with self.store.read_collections():
+            return [{"type": source_type, "id": source_id, "field": field, "target_type": target_type, "target_id": target_id}
+                    for target_type, target_id in sorted(self._missing)
+                    for source_type, source_id, field in self.dependents(target_type, target_id)]
+
+    def restrict_delete(self, entity_type, item_id):
+        """delete_item() guard: raises IntegrityError if other items reference the item."""
+        referrers = [{"type": source_type, "id": source_id, "field": field}
+                     for source_type, source_id, field in self.dependents(entity_type, item_id)
+                     if (source_type, source_id) != (entity_type, item_id)]
+        if referrers:
+            raise IntegrityError(f"Item '{item_id}' in '{entity_type}' is referenced by {len(referrers)} other item(s).", referrers)
+
+_reference_graph = None
+_reference_graph_lock = threading.Lock()
+
+def get_reference_graph():
+    """Returns the process-wide ReferenceGraph, creating and attaching it to the store on first use."""
+    global _reference_graph
+    with _reference_graph_lock:
+        if _reference_graph is None:
+            _reference_graph = ReferenceGraph()
+            _reference_graph.attach(store)
+        return _reference_graph
+
+# --- Reports ---
+def build_report(data):
+    """Everything the Full Report shows: entity types in display order (requirements first), their items and solution names."""
+    entity_types = sorted(data, key=lambda entity_type: (entity_type != "requirements", entity_type))
+    solution_names = {solution["id"]: solution.get("name") for solution in data.get("solutions", [])
+                      if isinstance(solution, dict) and isinstance(solution.get("id"), str)}
+    return {"entity_types": entity_types, "entities": {entity_type: data[entity_type] for entity_type in entity_types},
+            "solution_names": solution_names}
+
+def build_assessment_matrix(data):
+    """Requirements x solutions in one pass.
+
+    Each requirement row carries "results": the assessment result per
+    solution, aligned with "solutions" ("" when not assessed). "tags" holds
+    per-tag requirement counts for the filter cloud.
+    """
+    solutions = [{"id": solution.get("id"), "name": solution.get("name")}
+                 for solution in data.get("solutions", []) if isinstance(solution, dict)]
+    column = {solution["id"]: index for index, solution in enumerate(solutions)}
+    rows, tag_counts = [], {}
+    for requirement in data.get("requirements", []):
+        results, assessed = [""] * len(solutions), set()
+        for assessment in requirement.get("solution_assessments") or []:
+            index = column.get(assessment.get("solution_id")) if isinstance(assessment, dict) else None
+            if index is not None and index not in assessed: # The first assessment of a solution wins
+                assessed.add(index)
+                results[index] = assessment.get("result") or ""
+        tags = requirement.get("tags")
+        tags = [str(tag).strip() for tag in tags if str(tag).strip()] if isinstance(tags, list) else []
+        for tag in tags:
+            tag_counts[tag] = tag_counts.get(tag, 0) + 1
+        rows.append({"id": requirement.get("id"), "name": requirement.get("name"),
+                     "priority": requirement.get("priority"), "tags": tags, "results": results})
+    return {"solutions": solutions, "requirements": rows,
+            "tags": [{"tag": tag, "count": count} for tag, count in sorted(tag_counts.items())]}
+
+REPORTS = {"/api/report": build_report, "/api/assessment_matrix": build_assessment_matrix}
+
+class ReportCache:
+    """Encoded report responses, rebuilt at most once per store version."""
+
+    def __init__(self, data_store):
+        self.store = data_store
+        self._entries = {} # builder -> (version, EncodedBody of the JSON)
+        self._lock = threading.Lock()
+
+    def get(self, builder):
+        with self._lock:
+            entry = self._entries.get(builder)
+        if entry is not None and entry[0] == self.store.version:
+            return entry[1]
+        with self.store.read_collections() as collections:
+            version = self.store.version
+            data = {entity_type: collection.as_list() for entity_type, collection in collections.items()}
+        report = builder(data)
+        with JSON_DUMPS_SECONDS.time("report"):
+            body = EncodedBody(json.dumps(dict(report, version=version), ensure_ascii=False).encode('utf-8'))
+        with self._lock:
+            if builder not in self._entries or self._entries[builder][0] < version:
+                self._entries[builder] = (version, body)
+        return body
+
+report_cache = ReportCache(store)
+
+# --- Change Feed ---
+class ChangeFeed:
+    """Recent committed transactions, as per-entity diffs, for clients patching local state.
+
+    A store listener keeps the last `size` transactions. A diff is
+    {"version", "op": "put", "type", "id", "item"} or the same with
+    "op": "delete" and no item. Positions are "<instance>-<version>" so a
+    client holding one from an earlier run of the server is told to reload
+    rather than handed a wrong delta.
+    """
+
+    def __init__(self, size=CHANGE_FEED_SIZE):
+        self._entries = deque() # (version, diffs), or (version, None) for a reload
+        self._size = size
+        self._oldest = 0 # Deltas are known for every version after this one
+        self._latest = 0
+        self._changed = threading.Condition()
+        self._encoded = (None, None, b"") # (since, version, events) last encoded, shared by streams at the same position
+
+    def attach(self, data_store):
+        self.store = data_store
+        with data_lock.write():
+            data_store._current()
+            self._oldest = self._latest = data_store.version
+            data_store.add_listener(self._on_change)
+
+    @staticmethod
+    def diffs(version, ops):
+        result = []
+        for op in ops:
+            if op["op"] == "put":
+                result.append({"version": version, "op": "put", "type": op["type"], "id": op["item"]["id"], "item": op["item"]})
+            else:
+                result.append({"version": version, "op": "delete", "type": op["type"], "id": op["id"]})
+        return result
+
+    def _on_change(self, version, ops):
+        entry = (version, self.diffs(version, ops) if ops is not None else None)
+        with self._changed:
+            self._entries.append(entry)
+            if len(self._entries) > self._size:
+                self._oldest = self._entries.popleft()[0]
+            self._latest = version
+            self._changed.notify_all()
+
+    def position(self, version=None):
+        return f"{self.store.instance_id}-{self._latest if version is None else version}"
+
+    def parse_position(self, position):
+        """Returns the version of a position (or bare version number), or None if it is from another run or malformed."""
+        instance, _, version = position.strip().rpartition('-')
+        if instance and instance != self.store.instance_id:
+            return None
+        try:
+            return int(version)
+        except ValueError:
+            return None
+
+    def changes_since(self, since):
+        """Returns (version, diffs after `since`), or (version, None) if they are no longer known: reload instead."""
+        with self._changed:
+            if since is None or since < self._oldest or since > self._latest:
+                return self._latest, None
+            diffs = []
+            for version, entry_diffs in reversed(self._entries):
+                if version <= since:
+                    break
+                if entry_diffs is None:
+                    return self._latest, None # Reloaded from disk: there is no delta across it
+                diffs.extend(reversed(entry_diffs))
+            diffs.reverse()
+            return self._latest, diffs
+
+    def start_version(self, since):
+        """The version a stream continues after: that of position `since`, or the current one if it is empty."""
+        return self.parse_position(since) if since else self.store.current_version()
+
+    def stream_events(self, since):
+        """Returns (version, Server-Sent Events for the changes after `since`).
+
+        There is one "change" event per transaction, or a single "reload"
+        event if the delta is no longer known. The events are b"" when
+        nothing changed; the version is where the stream continues from.
+        """
+        self.store.current_version() # Picks up external edits of the data file
+        version, diffs = self.changes_since(since)
+        encoded = self._encoded
+        if encoded[:2] == (since, version):
+            return version, encoded[2]
+        if diffs is None:
+            events = format_event("reload", self.position(version), {"version": version})
+        else:
+            events = b"".join(format_event("change", self.position(diff_version), {"version": diff_version, "changes": list(group)})
+                              for diff_version, group in itertools.groupby(diffs, key=operator.itemgetter("version")))
+        self._encoded = (since, version, events)
+        return version, events
+
+    def wait(self, since, timeout):
+        """Blocks until a version after `since` is committed or `timeout` passes."""
+        with self._changed:
+            return self._changed.wait_for(lambda: self._latest > since, timeout)
+
+def format_event(event, event_id, data):
+    """Encodes one Server-Sent Event whose data is JSON (which never spans lines)."""
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode('utf-8')
+
+_change_feed = None
+_change_feed_lock = threading.Lock()
+
+def get_change_feed():
+    """Returns the process-wide ChangeFeed, creating and attaching it to the store on first use."""
+    global _change_feed
+    with _change_feed_lock:
+        if _change_feed is None:
+            _change_feed = ChangeFeed()
+            _change_feed.attach(store)
+        return _change_feed
+
+# --- HTTP Caching and Compression ---
+def negotiate_encoding(accept_encoding):
+    """Picks "gzip" or "deflate" from an Accept-Encoding header value, or None for identity."""
+    offered = {}
+    for part in (accept_encoding or "").split(','):
+        coding, _, params = part.partition(';')
+        match = re.search(r'q\s*=\s*([0-9.]+)', params)
+        try:
+            offered[coding.strip().lower()] = float(match.group(1)) if match else 1.0
+        except ValueError:
+            continue
+    for coding in ("gzip", "deflate"):
+        if offered.get(coding, offered.get("*", 0)) > 0:
+            return coding
+    return None
+
+class EncodedBody:
+    """A response body plus its validators, with compressed variants built once and reused."""
+
+    def __init__(self, data, etag=None, last_modified=None):
+        self.data = data
+        self.etag = etag
+        self.last_modified = last_modified # Seconds since the epoch
+        self._encoded = {}
+
+    def encode(self, coding):
+        """Returns the body in coding ("gzip" or "deflate"), compressing it on first use."""
+        if coding not in self._encoded:
+            if coding == "gzip":
+                self._encoded[coding] = gzip.compress(self.data, compresslevel=COMPRESS_LEVEL, mtime=0)
+            else:
+                self._encoded[coding] = zlib.compress(self.data, COMPRESS_LEVEL) # HTTP "deflate" is zlib-wrapped
+        return self._encoded[coding]
+
+class StaticAssets:
+    """Frontend files held in memory, precompressed, and reloaded when they change on disk."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._entries = {} # filename -> ((mtime_ns, size), EncodedBody)
+        self._lock = threading.Lock()
+
+    def get(self, filename):
+        """Returns the file as an EncodedBody, or None if it does not exist."""
+        path = os.path.join(self.directory, filename)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        signature = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            entry = self._entries.get(filename)
+        if entry is not None and entry[0] == signature:
+            return entry[1]
+        with open(path, 'rb') as f:
+            data = f.read()
+        body = EncodedBody(data, etag=f'W/"{hashlib.blake2b(data, digest_size=8).hexdigest()}"', last_modified=st.st_mtime)
+        for coding in ("gzip", "deflate"):
+            body.encode(coding)
+        with self._lock:
+            self._entries[filename] = (signature, body)
+        return body
+
+static_assets = StaticAssets(os.path.dirname(os.path.abspath(__file__)))
+
+# --- Request Handler Class ---
+CORS_HEADERS = [
+    ("Access-Control-Allow-Origin", "*"),
+    ("Access-Control-Allow-Methods", "GET, POST, PUT, DELETE, OPTIONS"),
+    ("Access-Control-Allow-Headers", "Content-Type"),
+    ("Access-Control-Expose-Headers", "X-Total-Count, X-Next-Cursor"),
+]
+
+ROUTES = {"/api/entity_types", "/api/search", "/api/changes", "/api/batch", "/api/metrics", "/api/profile", "/api/integrity",
+          "/api/export/rtf", "/api/export/ndjson", "/api/import/ndjson", *REPORTS}
+
+def route_label(path):
+    """Collapses a request path to its route, so item IDs do not multiply the metric series."""
+    path = urlparse(path).path.rstrip('/') or "/"
+    if path in ROUTES:
+        return path
+    if path.startswith(API_PREFIX + "/"):
+        depth = path.count('/') - API_PREFIX.count('/')
+        if depth == 3 and path.endswith("/impact"):
+            return API_PREFIX + "/{type}/{id}/impact"
+        return API_PREFIX + {1: "/{type}", 2: "/{type}/{id}"}.get(depth, "/other")
+    return "/api/other" if path.startswith("/api/") else "static"
+
+def data_metrics():
+    """Scrape-time gauges describing the store."""
+    with store.read_collections() as collections:
+        version = store.version
+        counts = sorted((entity_type, len(collection)) for entity_type, collection in collections.items())
+    return ["# HELP reqai_data_version Current data version.", "# TYPE reqai_data_version gauge", f"reqai_data_version {version}",
+            "# HELP reqai_entities Items per entity type.", "# TYPE reqai_entities gauge",
+            *(f'reqai_entities{{type="{entity_type}"}} {count}' for entity_type, count in counts),
+            "# HELP reqai_journal_bytes Size of the journal not yet compacted.", "# TYPE reqai_journal_bytes gauge",
+            f"reqai_journal_bytes {store.journal.size()}"]
+
+metrics.add_collector(data_metrics)
+
+class CountingWriter:
+    """Wraps a handler's wfile, counting the bytes written for the metrics."""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.written = 0
+
+    def write(self, data):
+        self.written += len(data)
+        return self.raw.write(data)
+
+    def __getattr__(self, name): # flush(), close(), closed
+        return getattr(self.raw, name)
 
-# --- Request Handler Class (Modifications) ---
 class APIRequestHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # Keep-alive: every response carries a length or is chunked
+    timeout = KEEPALIVE_TIMEOUT
+    disable_nagle_algorithm = True # Headers and body go out as separate writes
+
+    def handle_one_request(self):
+        self._etag = None # Validator for a 200 response to this request, if any
+        self._body_read = False
+        self._started = None # Set once a request line has arrived
+        self._status = None
+        if not isinstance(self.wfile, CountingWriter):
+            self.wfile = CountingWriter(self.wfile)
+        written = self.wfile.written
+        try:
+            super().handle_one_request()
+        finally:
+            profiler.active.discard(threading.get_ident())
+        if self._started is not None:
+            route, method = route_label(self.path), self.command or "-"
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - self._started, method, route)
+            HTTP_REQUESTS.inc(1, method, route, str(self._status))
+            HTTP_RESPONSE_BYTES.inc(self.wfile.written - written, route)
+        if self._body_unread():
+            self.close_connection = True # Unread body bytes would be parsed as the next request
+
+    def _body_unread(self):
+        headers = getattr(self, 'headers', None)
+        return headers is not None and not self._body_read and bool(
+            int(headers.get('Content-Length') or 0) or headers.get('Transfer-Encoding'))
+
+    def end_headers(self):
+        # Decide on closing before the response goes out, so the client is told and never reuses the socket
+        if not self.close_connection and (getattr(self.server, 'saturated', False) or self._body_unread()):
+            self.send_header("Connection", "close") # Also sets close_connection
+        super().end_headers()
+
+    def parse_request(self):
+        self._started = time.perf_counter()
+        profiler.active.add(threading.get_ident())
+        return super().parse_request()
 
-    # --- CORS Headers (Unchanged) ---
+    def send_response(self, code, message=None):
+        self._status = code
+        super().send_response(code, message)
+
+    def log_message(self, format, *args):
+        access_logger.info("%s " + format, self.address_string(), *args)
+
+    def log_error(self, format, *args):
+        if not format.startswith("Request timed out"): # An idle keep-alive connection expiring is routine
+            logger.warning("%s " + format, self.address_string(), *args)
+
+    # --- CORS Headers ---
     def send_cors_headers(self):
-        self.send_header("Access-Control-Allow-Origin", "*")
-        self.send_header("Access-Control-Allow-Methods", "GET, POST, PUT, DELETE, OPTIONS")
-        self.send_header("Access-Control-Allow-Headers", "Content-Type")
+        for name, value in CORS_HEADERS:
+            self.send_header(name, value)
 
     def do_OPTIONS(self):
         self.send_response(HTTPStatus.NO_CONTENT)
         self.send_cors_headers()
         self.end_headers()
 
-    # --- Response Helpers (Unchanged) ---
-    def send_json_response(self, data, status_code=HTTPStatus.OK):
-        # ... (keep existing send_json_response function) ...
+    # --- Response Helpers ---
+    def send_json_response(self, data, status_code=HTTPStatus.OK, headers=None):
+        with JSON_DUMPS_SECONDS.time("response"):
+            body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_json_body(body, status_code, headers)
+
+    def send_json_body(self, body, status_code=HTTPStatus.OK, headers=None):
+        """Sends already-encoded JSON (bytes or an EncodedBody)."""
+        if not isinstance(body, EncodedBody):
+            body = EncodedBody(body)
+        self.send_body(body, "application/json; charset=utf-8", status_code, headers)
+
+    def send_body(self, body, content_type, status_code=HTTPStatus.OK, headers=None):
+        """Sends an EncodedBody, compressed if the client accepts it, with its validators."""
+        coding = None
+        if len(body.data) >= COMPRESS_MIN_BYTES:
+            coding = negotiate_encoding(self.headers.get('Accept-Encoding'))
+        payload = body.encode(coding) if coding else body.data
         self.send_response(status_code)
         self.send_cors_headers()
-        self.send_header("Content-type", "application/json; charset=utf-8")
+        self.send_header("Content-type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.send_header("Vary", "Accept-Encoding")
+        if coding:
+            self.send_header("Content-Encoding", coding)
+        if status_code == HTTPStatus.OK:
+            self.send_validators(body.etag or self._etag, body.last_modified)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def send_validators(self, etag, last_modified=None):
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache") # Cache, but revalidate on every use
+        if last_modified is not None:
+            self.send_header("Last-Modified", self.date_time_string(last_modified))
+
+    def is_not_modified(self, etag, last_modified=None):
+        """True if the request's If-None-Match / If-Modified-Since show the client's copy is current."""
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match is not None: # Takes precedence over If-Modified-Since
+            weak = lambda tag: tag[2:] if tag.startswith('W/') else tag # Weak comparison, as for GET
+            tags = [weak(tag.strip()) for tag in if_none_match.split(',')]
+            return etag is not None and ('*' in tags or weak(etag) in tags)
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_modified_since and last_modified is not None:
+            try:
+                return int(last_modified) <= email.utils.parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def send_not_modified(self, etag, last_modified=None):
+        self.send_response(HTTPStatus.NOT_MODIFIED)
+        self.send_cors_headers()
+        self.send_header("Vary", "Accept-Encoding")
+        self.send_validators(etag, last_modified)
         self.end_headers()
-        self.wfile.write(json.dumps(data, ensure_ascii=False).encode('utf-8'))
 
     def send_error_response(self, message, status_code=HTTPStatus.BAD_REQUEST):
-        # ... (keep existing send_error_response function) ...
         error_data = {"error": message}
         self.send_json_response(error_data, status_code)
 
     def send_no_content_response(self):
-        # ... (keep existing send_no_content_response function) ...
         self.send_response(HTTPStatus.NO_CONTENT)
         self.send_cors_headers()
         self.end_headers()
 
-    # --- NEW: Send File Response ---
-    def send_file_response(self, data_bytes, status_code=HTTPStatus.OK, content_type="application/octet-stream", filename=None):
-        """Sends a response containing file data."""
-        self.send_response(status_code)
-        self.send_cors_headers() # Include CORS for consistency, though download might bypass some checks
+    def send_chunked_response(self, chunks, content_type="application/octet-stream", filename=None):
+        """Streams an iterable of byte chunks using chunked transfer encoding.
+
+        HTTP/1.0 clients do not understand chunked encoding; they get the raw
+        bytes and the end of the body is marked by closing the connection.
+        """
+        chunked = self.request_version == "HTTP/1.1"
+        self.send_response(HTTPStatus.OK)
+        self.send_cors_headers()
         self.send_header("Content-type", content_type)
-        self.send_header("Content-Length", str(len(data_bytes)))
         if filename:
             # Use Content-Disposition to suggest filename to browser
             # Ensure filename is ASCII or properly encoded (simple ASCII for now)
             safe_filename = "".join(c for c in filename if c.isalnum() or c in ['.', '_', '-']).strip()
             if not safe_filename: safe_filename = "download.dat"
             self.send_header("Content-Disposition", f'attachment; filename="{safe_filename}"')
+        if chunked:
+            self.send_header("Transfer-Encoding", "chunked")
+        else:
+            self.send_header("Connection", "close")
+            self.close_connection = True
         self.end_headers()
-        self.wfile.write(data_bytes)
+        for chunk in chunks:
+            if not chunk:
+                continue
+            if chunked:
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+            else:
+                self.wfile.write(chunk)
+        if chunked:
+            self.wfile.write(b"0\r\n\r\n")
 
-    # --- Request Body Parsing (Unchanged) ---
+    def send_change_stream(self, feed, since):
+        """Streams the change feed as Server-Sent Events, starting after version `since`.
+
+        The stream holds a worker, so it ends whenever a new connection is
+        waiting for one, with a final "reconnect" event. EventSource then
+        reconnects after CHANGE_STREAM_RETRY_MS with Last-Event-ID and resumes
+        where it left off; other clients must do the same.
+        """
+        self.send_response(HTTPStatus.OK)
+        self.send_cors_headers()
+        self.send_header("Content-type", "text/event-stream; charset=utf-8")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close") # The stream ends with the connection
+        self.end_headers()
+        self.close_connection = True
+        try:
+            self.wfile.write(b"retry: %d\n\n" % CHANGE_STREAM_RETRY_MS)
+            idle = 0
+            while True:
+                since, events = feed.stream_events(since)
+                if events:
+                    self.wfile.write(events)
+                    idle = 0
+                elif idle >= CHANGE_STREAM_HEARTBEAT:
+                    self.wfile.write(b": keep-alive\n\n") # Also how a departed client is noticed
+                    idle = 0
+                if getattr(self.server, 'saturated', False):
+                    self.wfile.write(format_event("reconnect", feed.position(since), {"position": feed.position(since)}))
+                    return
+                if not feed.wait(since, 1):
+                    idle += 1
+        except OSError: # Client went away (or stopped reading)
+            return
+
+    def iter_body_lines(self):
+        """Yields the request body line by line as it is read, for plain and chunked uploads."""
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            pending = b""
+            while True:
+                size = int(self.rfile.readline().split(b';')[0], 16)
+                if size == 0:
+                    while self.rfile.readline().strip(): # Skip any trailer headers
+                        pass
+                    break
+                pending += self.rfile.read(size)
+                self.rfile.readline() # CRLF after the chunk data
+                *lines, pending = pending.split(b"\n")
+                yield from lines
+            if pending:
+                yield pending
+            self._body_read = True
+            return
+        remaining = int(self.headers.get('Content-Length', 0))
+        while remaining > 0:
+            line = self.rfile.readline(remaining)
+            if not line:
+                break
+            remaining -= len(line)
+            yield line
+        self._body_read = remaining == 0
+
+    # --- Request Body Parsing ---
     def parse_json_body(self):
-        # ... (keep existing parse_json_body function) ...
         try:
             content_length = int(self.headers.get('Content-Length', 0))
             if content_length == 0: return None
             body = self.rfile.read(content_length)
+            self._body_read = True
             return json.loads(body.decode('utf-8'))
         except (TypeError, ValueError, json.JSONDecodeError) as e:
             raise ValueError(f"Invalid JSON received: {e}") from e
 
-    # --- GET Handler (MODIFIED) ---
+    # --- GET Handler ---
     def do_GET(self):
         """Handles GET requests for listing, retrieving, exporting, and serving frontend."""
         parsed_path = urlparse(self.path)
@@ -244,7 +2548,7 @@ class APIRequestHandler(http.server.BaseHTTPRequestHandler):
         path = original_path.rstrip('/') # Chemin normalisé pour les correspondances exactes (supprime la barre oblique finale)
                                         # Note: "/" devient "" après rstrip('/')
         
-        print(f"DEBUG: do_GET received original_path: '{original_path}', normalized_path_for_exact_match: '{path}'")
+        logger.debug("do_GET received original_path: '%s', normalized_path_for_exact_match: '%s'", original_path, path)
         
         # path_parts pour la logique de chemin segmenté, basé sur original_path nettoyé des deux côtés
         temp_stripped_path = original_path.strip('/')
@@ -254,30 +2558,95 @@ class APIRequestHandler(http.server.BaseHTTPRequestHandler):
         # La comparaison utilise 'path' normalisé
         if path == "/api/export/rtf":
             try:
-                current_data = load_data()
-                rtf_content = generate_rtf(current_data)
-                rtf_bytes = rtf_content.encode('ascii', errors='ignore') # Encode as basic ASCII/ANSI for RTF
+                current_data = load_data() # Shared lists of immutable items: safe to stream without the lock
+                chunks = encode_chunks(generate_rtf_fragments(current_data))
+                first_chunk = next(chunks) # Surface generation errors before any header is sent
 
                 # Generate filename with timestamp
                 now = datetime.now()
                 timestamp = now.strftime("%Y%m%d_%H%M%S")
                 filename = f"requirements_export_{timestamp}.rtf"
-
-                self.send_file_response(rtf_bytes, content_type="application/rtf", filename=filename)
-
             except Exception as e:
-                print(f"Error generating RTF export: {e}")
+                logger.exception("Error generating RTF export: %s", e)
                 self.send_error_response("Failed to generate RTF export.", HTTPStatus.INTERNAL_SERVER_ERROR)
+                return
+            try:
+                self.send_chunked_response(itertools.chain([first_chunk], chunks), content_type="application/rtf", filename=filename)
+            except Exception as e:
+                # Headers are already out; all we can do is drop the connection.
+                logger.warning("Error streaming RTF export: %s", e)
+                self.close_connection = True
             return
         # --- End of NEW Endpoint ---
 
+        # Endpoint: /api/export/ndjson[?type=...] (One {"type": ..., "item": ...} object per line, streamed)
+        if path == "/api/export/ndjson":
+            entity_types = parse_qs(parsed_path.query).get('type')
+            chunks = encode_chunks(generate_ndjson_lines(load_data(), entity_types), encoding='utf-8')
+            filename = f"requirements_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.ndjson"
+            try:
+                self.send_chunked_response(chunks, content_type="application/x-ndjson; charset=utf-8", filename=filename)
+            except Exception as e:
+                logger.warning("Error streaming NDJSON export: %s", e)
+                self.close_connection = True
+            return
+
+        # Endpoint: /api/metrics (Prometheus text format)
+        if path == "/api/metrics":
+            self.send_body(EncodedBody(metrics.render().encode('utf-8')), "text/plain; version=0.0.4; charset=utf-8")
+            return
+
+        # Endpoint: /api/profile (Collapsed stacks sampled since the profiler was last started)
+        if path == "/api/profile":
+            if not PROFILER_ALLOWED:
+                self.send_error_response("Profiling is disabled; start the server with --profiler.", HTTPStatus.FORBIDDEN)
+                return
+            self.send_body(EncodedBody(profiler.stacks().encode('utf-8')), "text/plain; charset=utf-8",
+                           headers={"X-Profile-Samples": str(profiler.sample_count)})
+            return
+
+        # Endpoint: /api/changes?since=<position> (Diffs after a version; an event stream for Accept: text/event-stream)
+        if path == "/api/changes":
+            feed = get_change_feed()
+            since = self.headers.get('Last-Event-ID') or parse_qs(parsed_path.query).get('since', [None])[0]
+            if 'text/event-stream' in self.headers.get('Accept', ''):
+                self.send_change_stream(feed, feed.start_version(since))
+                return
+            if not since:
+                self.send_json_response({"position": feed.position(store.current_version()), "changes": []})
+                return
+            store.current_version() # Picks up external edits of the data file
+            version, diffs = feed.changes_since(feed.parse_position(since))
+            if diffs is None:
+                self.send_json_response({"error": f"Changes since '{since}' are no longer available; reload the data.",
+                                         "position": feed.position(version)}, HTTPStatus.GONE)
+                return
+            self.send_json_response({"position": feed.position(version), "changes": diffs})
+            return
+
+        # Responses derived only from the data are validated by its version: polling gets 304s
+        if path in REPORTS or path in ("/api/entity_types", "/api/integrity") or path.startswith(API_PREFIX + "/"):
+            self._etag = f'W/"{store.instance_id}-{store.current_version()}"'
+            if self.is_not_modified(self._etag):
+                self.send_not_modified(self._etag)
+                return
+
+        # Endpoint: /api/report, /api/assessment_matrix (Joined views, cached per data version)
+        if path in REPORTS:
+            self.send_json_body(report_cache.get(REPORTS[path]))
+            return
+
+        # Endpoint: /api/integrity (References to items that do not exist, from the reference graph)
+        if path == "/api/integrity":
+            dangling = get_reference_graph().dangling()
+            self.send_json_response({"ok": not dangling, "dangling": dangling})
+            return
+
         # Endpoint: /api/entity_types (List all types)
         # La comparaison utilise 'path' normalisé
         if path == "/api/entity_types":
-             print(f"DEBUG: Handling /api/entity_types (normalized path: '{path}')")
-             current_data = load_data()
-             entity_types = list(current_data.keys())
-             print(f"DEBUG: Entity types to send: {entity_types}") # Ajout pour le débogage
+             entity_types = store.entity_types()
+             logger.debug("Entity types to send: %s", entity_types)
              self.send_json_response(entity_types)
              return
 
@@ -287,31 +2656,85 @@ class APIRequestHandler(http.server.BaseHTTPRequestHandler):
         query_params = parse_qs(parsed_path.query)
         limit = query_params.get('limit', [None])[0]
 
+        # Endpoint: /api/search?q=...&k=...[&nprobe=...][&exact=1] (Semantic search over requirement descriptions)
+        if path == "/api/search":
+            query = query_params.get('q', [''])[0].strip()
+            if not query:
+                self.send_error_response("Missing search query parameter 'q'.", HTTPStatus.BAD_REQUEST)
+                return
+            try:
+                k = int(query_params.get('k', [SEARCH_DEFAULT_K])[0])
+            except ValueError:
+                self.send_error_response("Parameter 'k' must be an integer.", HTTPStatus.BAD_REQUEST)
+                return
+            try:
+                nprobe = int(query_params.get('nprobe', [ANN_NPROBE])[0])
+            except ValueError:
+                self.send_error_response("Parameter 'nprobe' must be an integer.", HTTPStatus.BAD_REQUEST)
+                return
+            exact = query_params.get('exact', ['0'])[0] in ('1', 'true')
+            results = []
+            for item_id, score in get_search_index().search(query, k, nprobe=nprobe, exact=exact):
+                item = store.get_item(EmbeddingIndex.ENTITY_TYPE, item_id)
+                if item is not None:
+                    results.append({**item, "similarityScore": score})
+            self.send_json_response(results)
+            return
+
         if len(path_parts) >= 3 and path_parts[0] == "api" and path_parts[1] == "entities":
             entity_type = path_parts[2]
-            current_data = load_data()
 
-            if entity_type not in current_data:
+            if entity_type not in store.entity_types():
                 self.send_error_response(f"Entity type '{entity_type}' not found.", HTTPStatus.NOT_FOUND)
                 return
 
             # Get specific item
             if len(path_parts) == 4:
                 item_id = path_parts[3]
-                item = next((item for item in current_data[entity_type] if item.get("id") == item_id), None)
+                item = store.get_item(entity_type, item_id)
                 if item:
                     self.send_json_response(item)
                 else:
                     self.send_error_response(f"Item with ID '{item_id}' not found in '{entity_type}'.", HTTPStatus.NOT_FOUND)
-            # List items for the type (with optional limit)
+            # Items that depend on an item, transitively: ?depth= limits how many reference hops to follow
+            elif len(path_parts) == 5 and path_parts[4] == "impact":
+                item_id = path_parts[3]
+                try:
+                    depth = max(1, int(query_params['depth'][0])) if 'depth' in query_params else None
+                except ValueError:
+                    self.send_error_response("Query parameter 'depth' must be an integer.", HTTPStatus.BAD_REQUEST)
+                    return
+                dependents = get_reference_graph().impact(entity_type, item_id, depth)
+                if dependents is None:
+                    self.send_error_response(f"Item with ID '{item_id}' not found in '{entity_type}'.", HTTPStatus.NOT_FOUND)
+                else:
+                    self.send_json_response({"type": entity_type, "id": item_id, "count": len(dependents), "dependents": dependents})
+            # List items for the type: ?tag=&version=&priority= filters, ?sort=[-]field,
+            # ?fields=a,b projection, ?limit= page size and ?cursor= from X-Next-Cursor
             elif len(path_parts) == 3:
-                items_to_send = current_data[entity_type]
-                if limit:
-                    try:
-                        items_to_send = items_to_send[:int(limit)]
-                    except (ValueError, TypeError):
-                        pass # Ignore invalid limit
-                self.send_json_response(items_to_send)
+                try:
+                    limit = max(0, int(limit)) if limit else None
+                except (ValueError, TypeError):
+                    limit = None # Ignore invalid limit
+                filters = [(field, value.strip()) for param, field in LIST_FILTERS.items()
+                           for value in query_params.get(param, []) if value.strip()]
+                sort = query_params.get('sort', [None])[0] or None
+                try:
+                    result = get_field_index().query(entity_type, filters, sort, query_params.get('cursor', [None])[0], limit)
+                except ValueError as e:
+                    self.send_error_response(str(e), HTTPStatus.BAD_REQUEST)
+                    return
+                if result is None:
+                    self.send_error_response(f"Entity type '{entity_type}' not found.", HTTPStatus.NOT_FOUND)
+                    return
+                items_to_send, total, next_cursor = result
+                fields = [field for field in query_params.get('fields', [''])[0].split(',') if field]
+                if fields:
+                    items_to_send = [{field: item[field] for field in ['id', *fields] if field in item} for item in items_to_send]
+                headers = {"X-Total-Count": str(total)}
+                if next_cursor:
+                    headers["X-Next-Cursor"] = next_cursor
+                self.send_json_response(items_to_send, headers=headers)
             else:
                  self.send_error_response("Invalid API path.", HTTPStatus.BAD_REQUEST)
             return
@@ -326,102 +2749,431 @@ class APIRequestHandler(http.server.BaseHTTPRequestHandler):
             # Default 404 for other paths, log the original path requested
             self.send_error_response(f"API Endpoint or File not found for: {original_path}", HTTPStatus.NOT_FOUND)
 
-    # --- POST, PUT, DELETE Handlers (Unchanged) ---
+    # --- POST, PUT, DELETE Handlers ---
     def do_POST(self):
-        # ... (keep existing do_POST function) ...
         parsed_path = urlparse(self.path)
         path_parts = parsed_path.path.strip('/').split('/')
+        # Endpoint: /api/import/ndjson (Upserts streamed {"type", "item"} lines in batches)
+        if path_parts == ["api", "import", "ndjson"]:
+            try:
+                imported = import_ndjson_lines(self.iter_body_lines(), store)
+                self.send_json_response({"imported": imported}, HTTPStatus.OK)
+            except StorageError: self.send_error_response("Failed to save data.", HTTPStatus.INTERNAL_SERVER_ERROR)
+            except ValueError as e: self.send_error_response(str(e), HTTPStatus.BAD_REQUEST)
+            except Exception as e: logger.exception("Unexpected error in NDJSON import: %s", e); self.send_error_response("An internal server error occurred.", HTTPStatus.INTERNAL_SERVER_ERROR)
+            return
+        # Endpoint: /api/profile ({"enabled": true|false[, "interval_ms": n]} starts or stops the sampling profiler)
+        if path_parts == ["api", "profile"]:
+            if not PROFILER_ALLOWED:
+                self.send_error_response("Profiling is disabled; start the server with --profiler.", HTTPStatus.FORBIDDEN)
+                return
+            try:
+                body = self.parse_json_body()
+                if not isinstance(body, dict) or not isinstance(body.get("enabled"), bool):
+                    raise ValueError('Expected {"enabled": true} or {"enabled": false}.')
+                interval = float(body.get("interval_ms", PROFILE_INTERVAL * 1000)) / 1000
+                if not interval > 0:
+                    raise ValueError("'interval_ms' must be positive.")
+            except (TypeError, ValueError) as e:
+                self.send_error_response(str(e), HTTPStatus.BAD_REQUEST)
+                return
+            if body["enabled"]:
+                profiler.start(interval)
+            else:
+                profiler.stop()
+            self.send_json_response({"enabled": profiler.running, "samples": profiler.sample_count})
+            return
+        # Endpoint: /api/batch (Mixed creates/updates/deletes, applied atomically)
+        if path_parts == ["api", "batch"]:
+            try:
+                body = self.parse_json_body()
+                operations = body.get("operations") if isinstance(body, dict) else body
+                self.send_json_response({"results": store.apply_batch(operations)}, HTTPStatus.OK)
+            except StorageError: self.send_error_response("Failed to save data.", HTTPStatus.INTERNAL_SERVER_ERROR)
+            except ValueError as e: self.send_error_response(str(e), HTTPStatus.BAD_REQUEST)
+            except Exception as e: logger.exception("Unexpected error in batch POST: %s", e); self.send_error_response("An internal server error occurred.", HTTPStatus.INTERNAL_SERVER_ERROR)
+            return
         if len(path_parts) == 3 and path_parts[0] == "api" and path_parts[1] == "entities":
             entity_type = path_parts[2]
-            current_data = load_data()
-            if entity_type not in current_data: self.send_error_response(f"Entity type '{entity_type}' not found.", HTTPStatus.NOT_FOUND); return
+            if entity_type not in store.entity_types(): self.send_error_response(f"Entity type '{entity_type}' not found.", HTTPStatus.NOT_FOUND); return
             try:
                 new_item_data = self.parse_json_body()
                 if not new_item_data or not isinstance(new_item_data, dict): raise ValueError("Invalid or empty JSON data received for new item.")
-                new_id = generate_next_id(entity_type, current_data)
-                new_item_data['id'] = new_id
-                current_data[entity_type].append(new_item_data)
-                if save_data(current_data): self.send_json_response(new_item_data, HTTPStatus.CREATED)
-                else: self.send_error_response("Failed to save data.", HTTPStatus.INTERNAL_SERVER_ERROR)
+                new_item = store.create_item(entity_type, new_item_data)
+                self.send_json_response(new_item, HTTPStatus.CREATED)
+            except StorageError: self.send_error_response("Failed to save data.", HTTPStatus.INTERNAL_SERVER_ERROR)
             except ValueError as e: self.send_error_response(str(e), HTTPStatus.BAD_REQUEST)
-            except Exception as e: print(f"Unexpected error in POST: {e}"); self.send_error_response("An internal server error occurred.", HTTPStatus.INTERNAL_SERVER_ERROR)
+            except Exception as e: logger.exception("Unexpected error in POST: %s", e); self.send_error_response("An internal server error occurred.", HTTPStatus.INTERNAL_SERVER_ERROR)
             return
         self.send_error_response("Invalid API endpoint for POST.", HTTPStatus.METHOD_NOT_ALLOWED)
 
     def do_PUT(self):
-        # ... (keep existing do_PUT function) ...
         parsed_path = urlparse(self.path)
         path_parts = parsed_path.path.strip('/').split('/')
         if len(path_parts) == 4 and path_parts[0] == "api" and path_parts[1] == "entities":
-            entity_type = path_parts[2]; item_id = path_parts[3]; current_data = load_data()
-            if entity_type not in current_data: self.send_error_response(f"Entity type '{entity_type}' not found.", HTTPStatus.NOT_FOUND); return
-            item_index = next((i for i, item in enumerate(current_data[entity_type]) if item.get("id") == item_id), -1)
-            if item_index == -1: self.send_error_response(f"Item with ID '{item_id}' not found in '{entity_type}'.", HTTPStatus.NOT_FOUND); return
+            entity_type = path_parts[2]; item_id = path_parts[3]
+            if entity_type not in store.entity_types(): self.send_error_response(f"Entity type '{entity_type}' not found.", HTTPStatus.NOT_FOUND); return
+            if store.get_item(entity_type, item_id) is None: self.send_error_response(f"Item with ID '{item_id}' not found in '{entity_type}'.", HTTPStatus.NOT_FOUND); return
             try:
                 update_data = self.parse_json_body()
                 if not update_data or not isinstance(update_data, dict): raise ValueError("Invalid or empty JSON data received for update.")
-                original_item = current_data[entity_type][item_index]; original_item.update(update_data); original_item['id'] = item_id
-                current_data[entity_type][item_index] = original_item
-                if save_data(current_data): self.send_json_response(original_item, HTTPStatus.OK)
-                else: self.send_error_response("Failed to save updated data.", HTTPStatus.INTERNAL_SERVER_ERROR)
+                updated_item = store.update_item(entity_type, item_id, update_data)
+                if updated_item is None: self.send_error_response(f"Item with ID '{item_id}' not found in '{entity_type}'.", HTTPStatus.NOT_FOUND); return
+                self.send_json_response(updated_item, HTTPStatus.OK)
+            except StorageError: self.send_error_response("Failed to save updated data.", HTTPStatus.INTERNAL_SERVER_ERROR)
             except ValueError as e: self.send_error_response(str(e), HTTPStatus.BAD_REQUEST)
-            except Exception as e: print(f"Unexpected error in PUT: {e}"); self.send_error_response("An internal server error occurred.", HTTPStatus.INTERNAL_SERVER_ERROR)
+            except Exception as e: logger.exception("Unexpected error in PUT: %s", e); self.send_error_response("An internal server error occurred.", HTTPStatus.INTERNAL_SERVER_ERROR)
             return
         self.send_error_response("Invalid API endpoint for PUT.", HTTPStatus.METHOD_NOT_ALLOWED)
 
     def do_DELETE(self):
-        # ... (keep existing do_DELETE function) ...
         parsed_path = urlparse(self.path)
         path_parts = parsed_path.path.strip('/').split('/')
         if len(path_parts) == 4 and path_parts[0] == "api" and path_parts[1] == "entities":
-            entity_type = path_parts[2]; item_id = path_parts[3]; current_data = load_data()
-            if entity_type not in current_data: self.send_error_response(f"Entity type '{entity_type}' not found.", HTTPStatus.NOT_FOUND); return
-            initial_len = len(current_data[entity_type])
-            current_data[entity_type] = [item for item in current_data[entity_type] if item.get("id") != item_id]
-            if len(current_data[entity_type]) < initial_len:
-                if save_data(current_data): self.send_no_content_response()
-                else: self.send_error_response("Failed to save data after deletion.", HTTPStatus.INTERNAL_SERVER_ERROR)
-            else: self.send_error_response(f"Item with ID '{item_id}' not found in '{entity_type}' for deletion.", HTTPStatus.NOT_FOUND)
+            entity_type = path_parts[2]; item_id = path_parts[3]
+            if entity_type not in store.entity_types(): self.send_error_response(f"Entity type '{entity_type}' not found.", HTTPStatus.NOT_FOUND); return
+            on_delete = parse_qs(parsed_path.query).get('on_delete', [ON_DELETE])[0] # ?on_delete=restrict|allow overrides REQAI_ON_DELETE
+            guard = get_reference_graph().restrict_delete if on_delete == "restrict" else None
+            try:
+                if store.delete_item(entity_type, item_id, guard): self.send_no_content_response()
+                else: self.send_error_response(f"Item with ID '{item_id}' not found in '{entity_type}' for deletion.", HTTPStatus.NOT_FOUND)
+            except IntegrityError as e: self.send_json_response({"error": str(e), "dependents": e.dependents}, HTTPStatus.CONFLICT)
+            except StorageError: self.send_error_response("Failed to save data after deletion.", HTTPStatus.INTERNAL_SERVER_ERROR)
             return
         self.send_error_response("Invalid API endpoint for DELETE.", HTTPStatus.METHOD_NOT_ALLOWED)
 
-    # --- Static File Serving (Unchanged) ---
+    # --- Static File Serving ---
     def serve_static_file(self, filename, content_type):
-         # ... (keep existing serve_static_file function) ...
-         try:
-             filepath = os.path.join(os.path.dirname(__file__), filename)
-             if os.path.exists(filepath):
-                  with open(filepath, 'rb') as f:
-                      self.send_response(HTTPStatus.OK)
-                      self.send_header("Content-type", content_type)
-                      fs = os.fstat(f.fileno())
-                      self.send_header("Content-Length", str(fs.st_size))
-                      # Ensure CORS headers are sent even for static files if needed, though less critical
-                      # self.send_cors_headers() # Optional for static files
-                      self.end_headers()
-                      self.wfile.write(f.read())
-             else:
-                  self.send_error_response(f"{filename} not found.", HTTPStatus.NOT_FOUND)
-         except Exception as e:
-              print(f"Error serving static file {filename}: {e}")
-              self.send_error_response("Error serving file.", HTTPStatus.INTERNAL_SERVER_ERROR)
-
-
-# --- Main Execution (Unchanged) ---
-if __name__ == "__main__":
-    from socketserver import ThreadingMixIn
-    class ThreadingHTTPServer(ThreadingMixIn, http.server.HTTPServer):
+        """Serves a frontend file from memory, compressed when accepted, or 304 if the client's copy is current."""
+        try:
+            body = static_assets.get(filename)
+        except OSError as e:
+            logger.error("Error serving static file %s: %s", filename, e)
+            self.send_error_response("Error serving file.", HTTPStatus.INTERNAL_SERVER_ERROR)
+            return
+        if body is None:
+            self.send_error_response(f"{filename} not found.", HTTPStatus.NOT_FOUND)
+        elif self.is_not_modified(body.etag, body.last_modified):
+            self.send_not_modified(body.etag, body.last_modified)
+        else:
+            self.send_body(body, content_type)
+
+
+# --- Server ---
+class PooledHTTPServer(http.server.HTTPServer):
+    """HTTPServer that serves connections from a fixed-size pool of worker threads.
+
+    Unlike ThreadingMixIn it never has more than max_workers threads. When
+    every worker is busy the accept loop waits, and new connections queue in
+    the listen backlog instead of each getting a thread. A keep-alive
+    connection holds its worker between requests, so responses sent while
+    others wait carry "Connection: close" and end theirs, and idle ones time
+    out after KEEPALIVE_TIMEOUT.
+    """
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, server_address, handler_class, max_workers=MAX_WORKERS):
+        super().__init__(server_address, handler_class)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="http-worker")
+        self._free_workers = threading.BoundedSemaphore(max_workers)
+        self.saturated = False # Set while a new connection waits for a worker; keep-alive then yields
+
+    def process_request(self, request, client_address):
+        if not self._free_workers.acquire(blocking=False):
+            self.saturated = True
+            self._free_workers.acquire()
+            self.saturated = False
+        self._pool.submit(self._process_request_in_worker, request, client_address)
+
+    def _process_request_in_worker(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self._free_workers.release()
+
+    def server_close(self):
+        super().server_close()
+        self._pool.shutdown(wait=False)
+
+
+# --- Asyncio Server ---
+MAX_REQUEST_HEAD = 64 * 1024 # Request line plus headers; a longer head closes the connection
+
+class LoopReader:
+    """The read side of a connection, for handlers running in a worker thread.
+
+    The asyncio loop reads request heads itself, so idle and slow-to-send
+    connections cost no thread. The handler then reads the body through
+    the blocking read()/readline(), each waiting on the loop. Bytes past
+    the current request stay buffered for the next one.
+    """
+
+    def __init__(self, loop, reader):
+        self._loop = loop
+        self._reader = reader
+        self._buffer = bytearray()
+        self._pos = 0 # Start of the unread bytes in _buffer
+
+    async def _receive(self):
+        try:
+            data = await asyncio.wait_for(self._reader.read(65536), KEEPALIVE_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise socket.timeout("timed out") from None
+        if data:
+            del self._buffer[:self._pos]
+            self._pos = 0
+            self._buffer += data
+        return bool(data)
+
+    async def read_head(self):
+        """Waits for a complete request head and returns it (still unread), or None at EOF, timeout or overflow."""
+        while True:
+            end = self._buffer.find(b"\r\n\r\n", self._pos)
+            if end >= 0:
+                return bytes(self._buffer[self._pos:end + 4])
+            if len(self._buffer) - self._pos > MAX_REQUEST_HEAD:
+                return None
+            try:
+                if not await self._receive():
+                    return None
+            except socket.timeout:
+                return None
+
+    def skip(self, size):
+        self._pos += size
+
+    def _fill(self):
+        return asyncio.run_coroutine_threadsafe(self._receive(), self._loop).result()
+
+    def _take(self, end):
+        data = bytes(self._buffer[self._pos:end])
+        self._pos = end
+        return data
+
+    def read(self, size=-1):
+        while (size < 0 or len(self._buffer) - self._pos < size) and self._fill():
+            pass
+        return self._take(len(self._buffer) if size < 0 else min(len(self._buffer), self._pos + size))
+
+    def readline(self, limit=-1):
+        while True:
+            newline = self._buffer.find(b"\n", self._pos)
+            if newline >= 0 or 0 <= limit <= len(self._buffer) - self._pos or not self._fill():
+                break
+        end = newline + 1 if newline >= 0 else len(self._buffer)
+        return self._take(end if limit < 0 else min(end, self._pos + limit))
+
+class LoopWriter:
+    """The write side of a connection, for handlers running in a worker thread.
+
+    Each write waits until the transport has drained below its high-water
+    mark, so a slow client throttles the handler instead of buffering.
+    """
+
+    def __init__(self, loop, writer):
+        self._loop = loop
+        self._writer = writer
+
+    async def _write(self, data):
+        self._writer.write(data)
+        try:
+            await asyncio.wait_for(self._writer.drain(), KEEPALIVE_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise socket.timeout("timed out") from None
+
+    def write(self, data):
+        asyncio.run_coroutine_threadsafe(self._write(bytes(data)), self._loop).result()
+        return len(data)
+
+    def flush(self):
         pass
+
+class AsyncHTTPServer:
+    """Serves APIRequestHandler from an asyncio event loop.
+
+    Connections are coroutines: reading request heads, keep-alive waits and
+    change streams cost no thread. Each request is then handled, with its
+    store access and journal writes, by APIRequestHandler in a pool of
+    max_workers threads. Connections beyond max_connections get a 503.
+    """
+    saturated = False # Read by APIRequestHandler: workers are never held between requests here
+    request_queue_size = 1024
+
+    def __init__(self, server_address, handler_class, max_workers=MAX_WORKERS, max_connections=MAX_CONNECTIONS):
+        self.server_address = server_address
+        self.handler_class = handler_class
+        self.max_connections = max_connections
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="http-worker")
+        self._connections = 0
+
+    def serve_forever(self):
+        asyncio.run(self._serve())
+
+    async def _serve(self):
+        self._loop = asyncio.get_running_loop()
+        self._feed = get_change_feed()
+        self._changed = asyncio.Event() # Replaced after every commit; streams wait on the current one
+        store.add_listener(lambda version, ops: self._loop.call_soon_threadsafe(self._wake_streams))
+        server = await asyncio.start_server(self._handle_connection, *self.server_address,
+                                            backlog=self.request_queue_size)
+        async with server:
+            await server.serve_forever()
+
+    def _wake_streams(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def _handle_connection(self, reader, writer):
+        if self._connections >= self.max_connections:
+            writer.write(b"HTTP/1.1 503 Service Unavailable\r\nContent-Length: 0\r\nRetry-After: 1\r\nConnection: close\r\n\r\n")
+            writer.close()
+            return
+        self._connections += 1
+        rfile, wfile = LoopReader(self._loop, reader), LoopWriter(self._loop, writer)
+        client_address = writer.get_extra_info('peername') or ("", 0)
+        try:
+            while True:
+                head = await rfile.read_head()
+                if head is None:
+                    break
+                since = self._change_stream_start(head)
+                if since is not None:
+                    rfile.skip(len(head))
+                    await self._stream_changes(reader, writer, since)
+                    break
+                handler = self.handler_class.__new__(self.handler_class)
+                handler.client_address, handler.server = client_address, self
+                handler.rfile, handler.wfile = rfile, wfile
+                handler.close_connection = True
+                if await self._loop.run_in_executor(self._executor, self._handle_request, handler):
+                    break
+        except (OSError, asyncio.TimeoutError):
+            pass # Client went away or stopped reading
+        finally:
+            self._connections -= 1
+            writer.close()
+
+    def _handle_request(self, handler):
+        """Runs one request in a worker thread; returns True if the connection should be closed."""
+        try:
+            handler.handle_one_request()
+            return handler.close_connection
+        except OSError:
+            return True
+        except Exception as e:
+            logger.exception("Error handling request from %s: %r", handler.client_address, e)
+            return True
+
+    @staticmethod
+    def _change_stream_start(head):
+        """Returns the requested start position ("" for now) if head asks for the change stream, else None."""
+        request_line, _, header_block = head.partition(b"\r\n")
+        parts = request_line.split()
+        if len(parts) != 3 or parts[0] != b"GET":
+            return None
+        target = urlparse(parts[1].decode('latin-1'))
+        if target.path.rstrip('/') != "/api/changes":
+            return None
+        headers = http.client.parse_headers(io.BytesIO(header_block))
+        if 'text/event-stream' not in headers.get('Accept', ''):
+            return None
+        return headers.get('Last-Event-ID') or parse_qs(target.query).get('since', [""])[0]
+
+    async def _stream_changes(self, reader, writer, since):
+        """The change stream of APIRequestHandler.send_change_stream, as a coroutine: it holds no worker."""
+        started, written = time.perf_counter(), 0
+        since = await self._loop.run_in_executor(self._executor, self._feed.start_version, since)
+        head = [b"HTTP/1.1 200 OK", b"Content-Type: text/event-stream; charset=utf-8",
+                b"Cache-Control: no-cache", b"Connection: close"]
+        head += [f"{name}: {value}".encode('latin-1') for name, value in CORS_HEADERS]
+        head = b"\r\n".join(head) + b"\r\n\r\nretry: %d\n\n" % CHANGE_STREAM_RETRY_MS
+        writer.write(head)
+        written += len(head)
+        try:
+            while not reader.at_eof():
+                changed = self._changed
+                since, events = await self._loop.run_in_executor(self._executor, self._feed.stream_events, since)
+                writer.write(events)
+                written += len(events)
+                await asyncio.wait_for(writer.drain(), KEEPALIVE_TIMEOUT)
+                try:
+                    await asyncio.wait_for(changed.wait(), CHANGE_STREAM_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    writer.write(b": keep-alive\n\n")
+                    written += 15
+        finally:
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, "GET", "/api/changes")
+            HTTP_REQUESTS.inc(1, "GET", "/api/changes", "200")
+            HTTP_RESPONSE_BYTES.inc(written, "/api/changes")
+
+    def server_close(self):
+        self._executor.shutdown(wait=False)
+
+
+# --- Main Execution ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ReqAI API and frontend server.")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS,
+                        help=f"number of request worker threads (default: {MAX_WORKERS}, env REQAI_MAX_WORKERS)")
+    parser.add_argument("--server", choices=["threaded", "asyncio"], default="threaded",
+                        help="threaded: one worker per connection; asyncio: connections on an event loop, "
+                             f"workers only while a request is handled (up to {MAX_CONNECTIONS} connections, env REQAI_MAX_CONNECTIONS)")
+    parser.add_argument("--port", type=int, default=PORT, help=f"port to listen on (default: {PORT})")
+    parser.add_argument("--log-level", default=LOG_LEVEL, choices=["DEBUG", "INFO", "WARNING", "ERROR"], type=str.upper,
+                        help=f"least severe messages logged (default: {LOG_LEVEL}, env REQAI_LOG_LEVEL)")
+    parser.add_argument("--profiler", action="store_true", default=PROFILER_ALLOWED,
+                        help="allow starting the sampling profiler through /api/profile (env REQAI_PROFILER=1)")
+    subparsers = parser.add_subparsers(dest="command")
+    restore_parser = subparsers.add_parser("restore", help="rebuild the data file as of an hourly backup point")
+    restore_parser.add_argument("point", help="hour to restore, as YYYY-MM-DD-HH")
+    restore_parser.add_argument("-o", "--output", help="file to write (default: requirements_data.restored.<point>.json)")
+    args = parser.parse_args()
+
+    if args.command == "restore":
+        output = args.output or f"{os.path.splitext(DATA_FILE)[0]}.restored.{args.point}.json"
+        try:
+            restored = restore_backup(args.point)
+        except FileNotFoundError as e:
+            print(f"Error: {e}")
+            raise SystemExit(1)
+        if not save_data(restored, output):
+            raise SystemExit(1)
+        print(f"Restored {args.point} to {output}. Stop the server and move it over {DATA_FILE} (and remove {JOURNAL_FILE}) to roll back.")
+        raise SystemExit(0)
+
+    log_listener = setup_logging(args.log_level)
+    PROFILER_ALLOWED = args.profiler
     load_data()
-    print(f"Initial data loaded check complete. Using: {DATA_FILE}")
-    httpd = ThreadingHTTPServer((HOST, PORT), APIRequestHandler)
-    print(f"Serving API and Frontend on http://{HOST}:{PORT}")
-    print("API endpoints available under /api/")
-    print("RTF Export endpoint: /api/export/rtf")
-    print("Frontend available at /")
-    print("Press Ctrl+C to stop the server.")
+    logger.info("Initial data loaded check complete. Using: %s (journal: %s)", DATA_FILE, JOURNAL_FILE)
+    store.start_compactor()
+    BackupManager(store).start()
+    get_search_index() # Start indexing now rather than on the first query
+    get_field_index()
+    get_change_feed()
+    get_reference_graph()
+    if args.server == "asyncio":
+        httpd = AsyncHTTPServer((HOST, args.port), APIRequestHandler, max_workers=args.workers)
+    else:
+        httpd = PooledHTTPServer((HOST, args.port), APIRequestHandler, max_workers=args.workers)
+    logger.info("Serving API and Frontend on http://%s:%d (%s) with %d workers", HOST, args.port, args.server, args.workers)
+    logger.info("API endpoints available under /api/")
+    logger.info("RTF Export endpoint: /api/export/rtf")
+    logger.info("NDJSON endpoints: GET /api/export/ndjson, POST /api/import/ndjson")
+    logger.info("Search endpoint: /api/search?q=...&k=...")
+    logger.info("Change feed: /api/changes?since=... (Server-Sent Events with Accept: text/event-stream)")
+    logger.info("References: /api/entities/{type}/{id}/impact, /api/integrity (deletes: %s)", ON_DELETE)
+    logger.info("Metrics: /api/metrics (Prometheus text format)%s", "; profiler: /api/profile" if PROFILER_ALLOWED else "")
+    logger.info("Frontend available at /")
+    logger.info("Press Ctrl+C to stop the server.")
     try:
         httpd.serve_forever()
     except KeyboardInterrupt:
-        print("\nServer stopping.")
+        logger.info("Server stopping.")
         httpd.server_close()
+        store.compact()
+    finally:
+        log_listener.stop() # Flushes queued records
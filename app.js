@@ -7,13 +7,13 @@ document.addEventListener('DOMContentLoaded', () => {
 
 
     let currentEntityType = null; // Keep track of the currently viewed entity type
-    let currentDataCache = {}; // Simple cache for entity data
+    let currentDataCache = {}; // Simple cache for entity data, kept current by the /api/changes stream
+    let listShowsCache = false; // True while the list on screen is the full cached list (not search results or a form)
     let activeTagFilter = null; // NEW: To store the currently active tag filter
     let activeVersionFilter = null; // NEW: To store the currently active version filter
     let cachedSortedUniqueTags = null; // NEW: Cache for sorted unique tags for requirements
     let cachedSortedUniqueVersions = null; // NEW: Cache for sorted unique versions for requirements
-    let isIndexingInProgress = false; // NEW: Flag to track if indexing is ongoing
-    const EMBEDDINGS_CACHE_KEY = 'requirementsEmbeddingsCache'; // NEW: localStorage key for embeddings
+    localStorage.removeItem('requirementsEmbeddingsCache'); // Embeddings now live server-side; drop the old browser copy
     const ASSESSMENT_OPTIONS = [ // NEW: Assessment options
         { value: "", display: "-- Not Assessed --", emoji: " " },
         { value: "available", display: "Available", emoji: "✅" },
@@ -91,6 +91,7 @@ document.addEventListener('DOMContentLoaded', () => {
     function renderEntityList(entityType, items) {
         clearContent();
         currentEntityType = entityType; // Set current type
+        listShowsCache = items === currentDataCache[entityType];
         setActiveNavButton(entityType, 'entity');
 
         const title = entityType.replace(/_/g, ' ').replace(/\b\w/g, l => l.toUpperCase());
@@ -105,9 +106,6 @@ document.addEventListener('DOMContentLoaded', () => {
                     <span id="req-search-status" style="font-size: 0.9em; color: #666;"></span>
                 </div>
             `;
-            // Trigger indexing if not already done (or if model wasn't ready before)
-            // Defer indexing to prevent blocking the UI rendering, give a bit more time for initial render.
-            setTimeout(() => ensureExtractorInitializedAndIndexRequirements(items), 100);
         }
         // --- End of NEW Search UI ---
 
@@ -412,6 +410,7 @@ document.addEventListener('DOMContentLoaded', () => {
     async function renderForm(entityType, itemId = null) {
         clearContent();
         currentEntityType = entityType; // Ensure type is set
+        listShowsCache = false;
         setActiveNavButton(entityType, 'entity'); // Keep nav active
         showMessage('Loading form...'); // Show loading message
 
@@ -820,13 +819,8 @@ document.addEventListener('DOMContentLoaded', () => {
                 body: JSON.stringify(dataPayload)
             });
             showMessage(`Item ${isEdit ? 'updated' : 'added'} successfully!`, false);
-            // Clear relevant caches and reload list
-            delete currentDataCache[entityType];
-            if (entityType === 'requirements') {
-                 localStorage.removeItem(EMBEDDINGS_CACHE_KEY); // NEW: Invalidate embeddings cache
-                 delete currentDataCache['goals_and_objectives'];
-                 delete currentDataCache['business_processes'];
-            }
+            // Patch the cached list with the saved item and show it (the change stream sends the same diff)
+            applyChanges([{ op: 'put', type: entityType, id: result.id, item: result }]);
             loadEntityList(entityType);
         } catch (error) {
             // Error already shown by fetchAPI, maybe add more context
@@ -841,16 +835,25 @@ document.addEventListener('DOMContentLoaded', () => {
         const timeString = now.toLocaleTimeString('en-GB', options);
         const dateString = now.toLocaleDateString('en-CA'); // YYYY-MM-DD
 
-        if (confirm(`(${dateString} ${timeString} Brussels Time)\nAre you sure you want to delete item ${itemId} from ${entityType}?`)) {
+        // Warn about the items that reference this one (they would be left pointing at nothing)
+        let impactNote = '';
+        try {
+            const impact = await fetchAPI(`/entities/${entityType}/${itemId}/impact`);
+            if (impact && impact.count > 0) {
+                const direct = impact.dependents.filter(dependent => dependent.depth === 1).map(dependent => dependent.id);
+                impactNote = `\n\n${impact.count} item(s) depend on it, directly: ${direct.join(', ')}`;
+            }
+        } catch (error) {
+            // The check is advisory: still offer the deletion
+        }
+
+        if (confirm(`(${dateString} ${timeString} Brussels Time)\nAre you sure you want to delete item ${itemId} from ${entityType}?${impactNote}`)) {
             try {
                  showMessage('Deleting...');
                  await fetchAPI(`/entities/${entityType}/${itemId}`, { method: 'DELETE' });
                  showMessage(`Item ${itemId} deleted successfully.`, false);
-                 // Clear cache for this type and reload list
-                 delete currentDataCache[entityType];
-                 if (entityType === 'requirements') { // NEW: Invalidate embeddings cache
-                    localStorage.removeItem(EMBEDDINGS_CACHE_KEY);
-                 }
+                 // Drop the item from the cached list and show it
+                 applyChanges([{ op: 'delete', type: entityType, id: itemId }]);
                  loadEntityList(entityType);
             } catch (error) {
                  // Error message already shown by fetchAPI
@@ -929,6 +932,61 @@ document.addEventListener('DOMContentLoaded', () => {
     }
 
 
+    // --- Live Updates ---
+
+    // Applies /api/changes diffs ({op: 'put'|'delete', type, id, item}) to the cached lists.
+    // Types not cached yet are skipped: they are fetched fresh when first shown.
+    // Returns the entity types whose cached list changed.
+    function applyChanges(changes) {
+        const patched = new Map(); // entity type -> { items, positions: id -> index }
+        changes.forEach(change => {
+            if (!currentDataCache[change.type]) return;
+            let state = patched.get(change.type);
+            if (!state) {
+                const items = [...currentDataCache[change.type]];
+                state = { items, positions: new Map(items.map((item, index) => [item.id, index])) };
+                patched.set(change.type, state);
+            }
+            const index = state.positions.get(change.id);
+            if (change.op === 'delete') {
+                if (index !== undefined) {
+                    state.items[index] = null;
+                    state.positions.delete(change.id);
+                }
+            } else if (index !== undefined) {
+                state.items[index] = change.item;
+            } else {
+                state.positions.set(change.id, state.items.push(change.item) - 1);
+            }
+        });
+        patched.forEach((state, entityType) => {
+            currentDataCache[entityType] = state.items.filter(item => item !== null);
+        });
+        return [...patched.keys()];
+    }
+
+    // Follows the server's change stream so edits by others show up without refetching whole lists.
+    // EventSource reconnects on its own and resumes after the last event it received.
+    function subscribeToChanges() {
+        if (!window.EventSource) return;
+        const changes = new EventSource(`${API_BASE_URL}/changes`);
+        changes.addEventListener('change', event => {
+            const shownType = listShowsCache ? currentEntityType : null;
+            const patchedTypes = applyChanges(JSON.parse(event.data).changes);
+            if (shownType && patchedTypes.includes(shownType)) {
+                loadEntityList(shownType); // Renders from the patched cache
+            }
+        });
+        changes.addEventListener('reload', () => {
+            // The server could not provide a delta (restart, external edit, or too far behind)
+            const shownType = listShowsCache ? currentEntityType : null;
+            currentDataCache = {};
+            if (shownType) {
+                loadEntityList(shownType);
+            }
+        });
+    }
+
     // --- Initialization ---
 
     async function initialize() {
@@ -1021,200 +1079,10 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
 
-    // --- Text Embedding and Search Functionality ---
-    let featureExtractor = null;
-    let requirementsIndex = null;
-    let transformersInitialized = false;
-
-    async function ensureExtractorInitializedAndIndexRequirements(requirements) {
-        // 1. Initialize feature extractor (one-time)
-        if (!transformersInitialized) {
-            try {
-                showMessage('Loading text embedding model...');
-                const { pipeline } = await import('https://cdn.jsdelivr.net/npm/@xenova/transformers@2.6.0');
-                featureExtractor = await pipeline('feature-extraction', 'Xenova/all-MiniLM-L6-v2');
-                transformersInitialized = true;
-                showMessage('Text embedding model ready.');
-            } catch (error) {
-                console.error('Failed to initialize feature extractor:', error);
-                showMessage('Failed to initialize search capabilities. Search will be unavailable.', true);
-                return false; // Critical failure
-            }
-        }
-
-        // If no requirements or featureExtractor failed, nothing to index
-        if (!requirements || requirements.length === 0 || !featureExtractor) {
-            return false;
-        }
-
-        // NEW: Try to load embeddings from localStorage
-        if (transformersInitialized) { // Only attempt if model itself is ready
-            try {
-                const cachedEmbeddingsJSON = localStorage.getItem(EMBEDDINGS_CACHE_KEY);
-                if (cachedEmbeddingsJSON) {
-                    const loadedIndex = JSON.parse(cachedEmbeddingsJSON);
-                    const indexableRequirementsCount = requirements.filter(r => r.id && r.description && String(r.description).trim() !== '').length;
-
-                    if (Object.keys(loadedIndex).length > 0 && indexableRequirementsCount > 0 && Object.keys(loadedIndex).length === indexableRequirementsCount) {
-                        requirementsIndex = loadedIndex;
-                        showMessage('Loaded requirement embeddings from cache.');
-                        // isIndexingInProgress remains false as we are not actively batch indexing
-                        return true; // Successfully loaded from cache
-                    } else if (Object.keys(loadedIndex).length > 0) {
-                        // Mismatch in count, cache might be stale
-                        showMessage('Cached embeddings seem outdated, re-indexing...');
-                        localStorage.removeItem(EMBEDDINGS_CACHE_KEY); // Clear stale cache
-                    }
-                }
-            } catch (e) {
-                console.warn('Could not load or parse embeddings from localStorage:', e);
-                localStorage.removeItem(EMBEDDINGS_CACHE_KEY); // Clear cache if parsing failed
-            }
-        }
-
-        if (isIndexingInProgress) {
-            showMessage('Indexing is already in progress. Please wait.');
-            return false; 
-        }
-
-        isIndexingInProgress = true;
-        requirementsIndex = {}; // Always start with a fresh index if not loaded from cache
-
-        showMessage('Indexing requirements for search (this may take a moment)...');
-        try {
-            const BATCH_SIZE = 10; // Process requirements in chunks
-            let processedCount = 0;
-            const totalRequirements = requirements.length;
-
-            for (let i = 0; i < totalRequirements; i += BATCH_SIZE) {
-                const currentBatch = requirements.slice(i, i + BATCH_SIZE);
-                
-                const itemsToIndexInBatch = currentBatch.filter(req => req.id && req.description && String(req.description).trim() !== '');
-                const textsToEmbed = itemsToIndexInBatch.map(req => req.description);
-
-                if (textsToEmbed.length > 0) {
-                    const embeddingsBatch = await featureExtractor(textsToEmbed, { pooling: 'mean', normalize: true });
-
-                    itemsToIndexInBatch.forEach((req, indexInFilteredBatch) => {
-                        requirementsIndex[req.id] = {
-                            embedding: embeddingsBatch[indexInFilteredBatch].data,
-                            requirement: req
-                        };
-                    });
-                }
-
-                processedCount += currentBatch.length;
-                // Update message only if not the very last batch that would be covered by final message
-                if (processedCount < totalRequirements) {
-                     showMessage(`Indexing: ${processedCount}/${totalRequirements} requirements processed...`);
-                }
-                
-                // Yield to the event loop to keep UI responsive
-                await new Promise(resolve => setTimeout(resolve, 0)); 
-            }
-            const indexedItemsCount = Object.keys(requirementsIndex).length;
-            let finalMessage = '';
-
-            if (indexedItemsCount > 0) {
-                finalMessage = `Requirements indexed. ${indexedItemsCount} items ready.`;
-            } else if (totalRequirements > 0) {
-                finalMessage = `Indexing complete. No requirements had descriptions to index.`;
-            } else {
-                finalMessage = `Indexing complete. No requirements to index.`;
-            }
-
-            // NEW: Try to save to localStorage
-            if (indexedItemsCount > 0) { // Only try to save if there's something to save
-                try {
-                    localStorage.setItem(EMBEDDINGS_CACHE_KEY, JSON.stringify(requirementsIndex));
-                    finalMessage = `Requirements indexed and embeddings cached. ${indexedItemsCount} items ready.`;
-                } catch (e) {
-                    console.warn('Could not save embeddings to localStorage:', e);
-                    finalMessage += ' (Could not cache embeddings)';
-                }
-            }
-            showMessage(finalMessage);
-            return true;
-        } catch (error) {
-            console.error('Failed to index requirements:', error);
-            showMessage('Error during requirements indexing. Search may be incomplete.', true);
-            return false;
-        } finally {
-            isIndexingInProgress = false;
-        }
-    }
-
-    async function performSearch() {
-        const searchInput = document.getElementById('req-search-input');
-        const searchTerm = searchInput?.value.trim();
-        const searchStatus = document.getElementById('req-search-status');
-        
-        if (!searchTerm) {
-            searchStatus.textContent = 'Please enter a search term';
-            return;
-        }
-
-        try {
-            searchStatus.textContent = 'Searching...';
-            // First ensure we have embeddings for all requirements
-            const allRequirements = currentDataCache['requirements'] || await fetchAPI('/entities/requirements');
-            const initialized = await ensureExtractorInitializedAndIndexRequirements(allRequirements);
-            
-            if (!initialized || !featureExtractor) {
-                throw new Error('Search functionality not available');
-            }
-
-            // Generate embedding for search query
-            const queryEmbedding = await featureExtractor(searchTerm, { pooling: 'mean', normalize: true });
-            
-            // Calculate cosine similarity between query and all requirements
-            const results = [];
-            for (const reqId in requirementsIndex) {
-                const { embedding, requirement } = requirementsIndex[reqId];
-                const similarity = cosineSimilarity(queryEmbedding.data, embedding);
-                
-                if (similarity > 0.3) { // Only include results with reasonable similarity
-                    results.push({
-                        ...requirement,
-                        similarityScore: similarity
-                    });
-                }
-            }
-
-            // Sort by similarity score (highest first)
-            results.sort((a, b) => b.similarityScore - a.similarityScore);
-            
-            if (results && results.length > 0) {
-                renderEntityList('requirements', results);
-                searchStatus.textContent = `Found ${results.length} matching requirements`;
-            } else {
-                renderEntityList('requirements', []);
-                searchStatus.textContent = 'No matching requirements found';
-            }
-        } catch (error) {
-            console.error('Search failed:', error);
-            searchStatus.textContent = 'Search failed - see console';
-            showMessage(`Search error: ${error.message}`, true);
-        }
-    }
-
-    // Utility function to calculate cosine similarity between vectors
-    function cosineSimilarity(a, b) {
-        let dotProduct = 0;
-        let magnitudeA = 0;
-        let magnitudeB = 0;
-        
-        for (let i = 0; i < a.length; i++) {
-            dotProduct += a[i] * b[i];
-            magnitudeA += a[i] * a[i];
-            magnitudeB += b[i] * b[i];
-        }
-        
-        magnitudeA = Math.sqrt(magnitudeA);
-        magnitudeB = Math.sqrt(magnitudeB);
-        
-        return magnitudeA && magnitudeB ? dotProduct / (magnitudeA * magnitudeB) : 0;
-    }
+    // --- Search Functionality ---
+    // Embedding and ranking happen server-side (/api/search), so every browser
+    // gets the same results without downloading a model or indexing locally.
+    const SEARCH_RESULT_LIMIT = 50;
 
     // --- NEW: Tag Filtering Functions ---
     function applyTagFilter(tag) {
@@ -1290,11 +1158,8 @@ document.addEventListener('DOMContentLoaded', () => {
 
             showMessage(`Requirement ${itemId} duplicated successfully as ${duplicatedItem.id}.`, false);
             
-            // 4. Clear cache and reload list to show the new item
-            delete currentDataCache[entityType];
-            if (entityType === 'requirements') { // NEW: Invalidate embeddings cache
-                localStorage.removeItem(EMBEDDINGS_CACHE_KEY);
-            }
+            // 4. Add the new item to the cached list and show it
+            applyChanges([{ op: 'put', type: entityType, id: duplicatedItem.id, item: duplicatedItem }]);
             loadEntityList(entityType);
 
         } catch (error) {
@@ -1333,18 +1198,12 @@ document.addEventListener('DOMContentLoaded', () => {
         showMessage('Loading Solution Assessment Matrix...');
 
         try {
-            // Fetch requirements and solutions data concurrently
-            const [requirementsData, solutionsData] = await Promise.all([
-                currentDataCache['requirements'] ? Promise.resolve(currentDataCache['requirements']) : fetchAPI('/entities/requirements'),
-                currentDataCache['solutions'] ? Promise.resolve(currentDataCache['solutions']) : fetchAPI('/entities/solutions')
-            ]);
-
-            // Cache fetched data
-            currentDataCache['requirements'] = requirementsData || [];
-            currentDataCache['solutions'] = solutionsData || [];
-
-            const requirements = currentDataCache['requirements'];
-            const solutions = currentDataCache['solutions'];
+            // The server joins requirements x solutions: each row's `results` is
+            // aligned with `solutions` ("" = not assessed), and tag counts come precomputed.
+            const matrix = await fetchAPI('/assessment_matrix');
+            const requirements = matrix.requirements || [];
+            const solutions = matrix.solutions || [];
+            const solutionColumn = new Map(solutions.map((sol, index) => [sol.id, index]));
 
             if (!requirements || requirements.length === 0) {
                 contentArea.innerHTML = '<h2>Solution Assessment Matrix</h2><p>No requirements found to display in the matrix.</p>';
@@ -1358,27 +1217,12 @@ document.addEventListener('DOMContentLoaded', () => {
             }
 
             // Update tag cache based on all requirements
-            const tagCounts = new Map();
-            requirements.forEach(item => {
-                if (item.tags && Array.isArray(item.tags)) {
-                    item.tags.forEach(tag => {
-                        const trimmedTag = String(tag).trim();
-                        if (trimmedTag) {
-                            tagCounts.set(trimmedTag, (tagCounts.get(trimmedTag) || 0) + 1);
-                        }
-                    });
-                }
-            });
-            cachedSortedUniqueTags = Array.from(tagCounts.entries())
-                .map(([tag, count]) => ({ tag, count }))
-                .sort((a, b) => a.tag.localeCompare(b.tag));
+            cachedSortedUniqueTags = (matrix.tags || []).slice().sort((a, b) => a.tag.localeCompare(b.tag));
 
-            // Filter requirements based on the active tag filter
+            // Filter requirements based on the active tag filter (row tags are already trimmed)
             let displayRequirements = [...requirements];
             if (activeTagFilter) {
-                displayRequirements = displayRequirements.filter(
-                    item => item.tags && Array.isArray(item.tags) && item.tags.some(t => String(t).trim() === activeTagFilter)
-                );
+                displayRequirements = displayRequirements.filter(item => item.tags.includes(activeTagFilter));
             }
 
             // --- Sorting Logic ---
@@ -1413,10 +1257,9 @@ document.addEventListener('DOMContentLoaded', () => {
                         valB = priorityOrder[b.priority] || 99;
                         break;
                     default: // This handles sorting by solution ID
-                        const assessmentA = a.solution_assessments?.find(asm => asm.solution_id === matrixSortKey);
-                        const assessmentB = b.solution_assessments?.find(asm => asm.solution_id === matrixSortKey);
-                        valA = assessmentOrder[assessmentA?.result || ""] || 99;
-                        valB = assessmentOrder[assessmentB?.result || ""] || 99;
+                        const column = solutionColumn.get(matrixSortKey);
+                        valA = assessmentOrder[column === undefined ? "" : a.results[column]] || 99;
+                        valB = assessmentOrder[column === undefined ? "" : b.results[column]] || 99;
                         break;
                 }
 
@@ -1502,12 +1345,11 @@ document.addEventListener('DOMContentLoaded', () => {
                 html += `<td>${escapeHTML(req.id)}</td>`; // NEW: Add cell for Requirement ID
                 html += `<td class="assessment-cell">${priorityDisplay}</td>`;
                 html += `<td>${reqLink}</td>`; 
-                solutions.forEach(sol => {
-                    const assessment = req.solution_assessments?.find(asm => asm.solution_id === sol.id);
+                req.results.forEach(result => {
                     // Default to "Not Assessed" emoji if no assessment or no result ❓
                     let emoji = ASSESSMENT_OPTIONS.find(opt => opt.value === "")?.emoji || ' ';
-                    if (assessment && assessment.result) {
-                        const option = ASSESSMENT_OPTIONS.find(opt => opt.value === assessment.result);
+                    if (result) {
+                        const option = ASSESSMENT_OPTIONS.find(opt => opt.value === result);
                         if (option) {
                             emoji = option.emoji;
                         }
@@ -1567,18 +1409,18 @@ document.addEventListener('DOMContentLoaded', () => {
         const includeAssessments = toggleEl.checked;
 
         try {
-            const entityTypes = await fetchAPI('/entity_types');
-            if (!entityTypes || entityTypes.length === 0) {
+            // One request returns every entity type (requirements first, then
+            // alphabetical), their items and the solution names assessments refer to.
+            const report = await fetchAPI('/report');
+            const sortedEntityTypes = report.entity_types || [];
+            if (sortedEntityTypes.length === 0) {
                 reportContentEl.innerHTML = '<p>No entity types found.</p>'; // Render inside content div
                 showMessage('');
                 return;
             }
-
-            // Ensure 'requirements' is first, then sort others alphabetically
-            const sortedEntityTypes = ['requirements', ...entityTypes.filter(et => et !== 'requirements').sort()];
+            const solutionNames = report.solution_names || {};
 
             for (const entityType of sortedEntityTypes) {
-                if (!entityTypes.includes(entityType)) continue;
 
                 // Create section container and append it
                 const sectionEl = document.createElement('section');
@@ -1588,7 +1430,7 @@ document.addEventListener('DOMContentLoaded', () => {
                 reportContentEl.appendChild(sectionEl);
                 
                 try {
-                    const items = currentDataCache[entityType] || await fetchAPI(`/entities/${entityType}`);
+                    const items = report.entities[entityType];
                     currentDataCache[entityType] = items || [];
 
                     if (!items || items.length === 0) {
@@ -1598,17 +1440,6 @@ document.addEventListener('DOMContentLoaded', () => {
 
                     let sectionHtml = '';
                     if (entityType === 'requirements') {
-                        // Ensure solutions data is available for assessments
-                        if (!currentDataCache['solutions']) {
-                            try {
-                                const solutionsData = await fetchAPI('/entities/solutions');
-                                currentDataCache['solutions'] = solutionsData || [];
-                            } catch (solError) {
-                                console.warn('Could not load solutions data for report details:', solError);
-                                currentDataCache['solutions'] = [];
-                            }
-                        }
-
                         items.forEach(item => {
                             sectionHtml += '<div class="report-requirement-item">';
                             sectionHtml += `<h4>${escapeHTML(item.id)}: ${escapeHTML(item.name)}</h4>`;
@@ -1652,8 +1483,7 @@ document.addEventListener('DOMContentLoaded', () => {
                             if (includeAssessments && item.solution_assessments && item.solution_assessments.length > 0) {
                                 sectionHtml += '<h5>Solution Assessments:</h5><ul>';
                                 item.solution_assessments.forEach(asm => {
-                                    const solution = currentDataCache['solutions']?.find(s => s.id === asm.solution_id);
-                                    const solName = solution ? escapeHTML(solution.name) : `ID: ${escapeHTML(asm.solution_id)}`;
+                                    const solName = Object.prototype.hasOwnProperty.call(solutionNames, asm.solution_id) ? escapeHTML(solutionNames[asm.solution_id]) : `ID: ${escapeHTML(asm.solution_id)}`;
                                     const asmOpt = ASSESSMENT_OPTIONS.find(opt => opt.value === asm.result);
                                     const asmDisplay = asmOpt ? `${asmOpt.emoji} ${escapeHTML(asmOpt.display)}` : escapeHTML(asm.result);
                                     // asm.description is in markdown, so we transform it to HTML
@@ -1721,30 +1551,10 @@ document.addEventListener('DOMContentLoaded', () => {
 
         try {
             searchStatus.textContent = 'Searching...';
-            const allRequirements = currentDataCache['requirements'] || await fetchAPI('/entities/requirements');
-            const initialized = await ensureExtractorInitializedAndIndexRequirements(allRequirements);
-            
-            if (!initialized || !featureExtractor) {
-                throw new Error('Search functionality not available');
-            }
+            const params = new URLSearchParams({ q: searchTerm, k: SEARCH_RESULT_LIMIT });
+            // Results come back ranked, each with a similarityScore; drop the ones that share no terms
+            const results = (await fetchAPI(`/search?${params}`)).filter(item => item.similarityScore > 0);
 
-            const queryEmbedding = await featureExtractor(searchTerm, { pooling: 'mean', normalize: true });
-            
-            const results = [];
-            for (const reqId in requirementsIndex) {
-                const { embedding, requirement } = requirementsIndex[reqId];
-                const similarity = cosineSimilarity(queryEmbedding.data, embedding);
-                
-                if (similarity > 0.3) { 
-                    results.push({
-                        ...requirement,
-                        similarityScore: similarity
-                    });
-                }
-            }
-
-            results.sort((a, b) => b.similarityScore - a.similarityScore);
-            
             if (results && results.length > 0) {
                 renderEntityList('requirements', results); // Pass search results
                 searchStatus.textContent = `Found ${results.length} matching requirements`;
@@ -1781,4 +1591,5 @@ document.addEventListener('DOMContentLoaded', () => {
     // or potentially trigger it here if requirements are the default view.
     // For now, it's triggered by loadEntityList('requirements').
     initialize();
+    subscribeToChanges();
 });
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Measure recall@k and queries per second of the IVF search index against
+exact search, for several nprobe settings. Requires NumPy.
+Usage: python3 benchmarks/bench_ann.py [rows ...]
+"""
+
+import os
+import sys
+import time
+import random
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import api
+
+SIZES = [10000, 50000]
+QUERIES = 200
+K = 10
+NPROBES = [1, 2, 4, 8, 16, 32, 64]
+
+TOPICS = ["login", "password", "payment", "invoice", "refund", "report", "dashboard", "export",
+          "audit", "logging", "user", "role", "permission", "cache", "search", "index", "mobile",
+          "offline", "sync", "notification", "email", "ledger", "tax", "shipping", "inventory",
+          "backup", "restore", "latency", "throughput", "encryption", "consent", "retention"]
+FILLER = ["the system shall", "support", "allow", "within", "seconds", "for every", "customer",
+          "administrator", "record", "request", "and", "with", "on", "each", "when", "after"]
+
+def make_texts(n, seed):
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(n):
+        topics = rng.sample(TOPICS, 3)
+        words = [rng.choice(topics) if rng.random() < 0.5 else rng.choice(FILLER) for _ in range(14)]
+        texts.append(" ".join(words))
+    return texts
+
+def build_index(path, n):
+    index = api.EmbeddingIndex(api.make_embedder(), path)
+    texts = make_texts(n, seed=n)
+    index._apply({f"REQ_{i}": (index.content_hash(text), text) for i, text in enumerate(texts)}, [])
+    start = time.perf_counter()
+    index._maybe_train()
+    return index, time.perf_counter() - start
+
+def run_queries(index, queries, **options):
+    results = []
+    start = time.perf_counter()
+    for query in queries:
+        results.append({item_id for item_id, _ in index.search(query, K, **options)})
+    return results, len(queries) / (time.perf_counter() - start)
+
+def main():
+    if api.np is None:
+        sys.exit("bench_ann.py needs NumPy: the IVF index is only built when it is installed.")
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+    api.ANN_MIN_ROWS = 0 # Always train, whatever the size
+    for n in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            index, train_time = build_index(os.path.join(tmp, "embeddings"), n)
+            queries = make_texts(QUERIES, seed=-n)
+            exact, exact_qps = run_queries(index, queries, exact=True)
+            print(f"\n{n} rows, {index.ann.nlist} clusters (trained in {train_time:.2f}s), recall@{K} over {QUERIES} queries")
+            print(f"{'nprobe':>8} | {'recall':>7} {'QPS':>8} {'speedup':>8}")
+            print(f"{'exact':>8} | {1.0:>7.3f} {exact_qps:>8.0f} {1.0:>7.1f}x")
+            for nprobe in NPROBES:
+                if nprobe > index.ann.nlist:
+                    break
+                approx, qps = run_queries(index, queries, nprobe=nprobe)
+                recall = sum(len(a & e) for a, e in zip(approx, exact)) / sum(len(e) for e in exact)
+                print(f"{nprobe:>8} | {recall:>7.3f} {qps:>8.0f} {qps / exact_qps:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Benchmark the API end to end on generated datasets: list, get, create,
+update, delete, RTF export and search, driven through APIRequestHandler
+in-process (no sockets) and over local HTTP against a server subprocess.
+Reports throughput, p50/p95/p99 latency, errors and peak RSS per dataset
+size. Save a run with --save and compare a later one with --baseline to
+see regressions.
+Usage: python3 benchmarks/bench_api.py [--sizes 1000 10000 100000] [--mode inproc|http] [--save results.json] [--baseline results.json]
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import resource
+import tempfile
+import itertools
+import threading
+import subprocess
+import http.client
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import api
+import datagen
+from bench_server import peak_rss_kb, percentile, wait_for_port
+
+API_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api.py")
+MODES = ["inproc", "http"]
+OPERATIONS = ["list", "get", "create", "update", "delete", "search", "export_rtf"]
+READ_OPERATIONS = {"list", "get", "search"} # Warmed up before timing; mutations and exports are not
+WARMUP = 5
+
+# --- Clients: one request in, (status, body) out ---
+class InProcessClient:
+    """Runs each request through a fresh APIRequestHandler on in-memory streams, as a server worker would."""
+
+    def request(self, method, path, body=None):
+        payload = json.dumps(body).encode('utf-8') if body is not None else b""
+        head = f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(payload)}\r\n"
+        if payload:
+            head += "Content-Type: application/json\r\n"
+        handler = api.APIRequestHandler.__new__(api.APIRequestHandler)
+        handler.client_address, handler.server = ("127.0.0.1", 0), None
+        handler.rfile, handler.wfile = io.BytesIO(head.encode('latin-1') + b"\r\n" + payload), io.BytesIO()
+        handler.close_connection = True
+        handler.handle_one_request()
+        response = handler.wfile.getvalue()
+        status = int(response.split(b" ", 2)[1])
+        return status, response[response.index(b"\r\n\r\n") + 4:]
+
+class HTTPClient:
+    """One keep-alive connection per thread to a running server."""
+
+    def __init__(self, port):
+        self.port = port
+        self._local = threading.local()
+
+    def request(self, method, path, body=None):
+        payload = json.dumps(body).encode('utf-8') if body is not None else None
+        headers = {"Content-Type": "application/json"} if payload else {}
+        for attempt in range(2):
+            connection = getattr(self._local, "connection", None)
+            if connection is None:
+                connection = self._local.connection = http.client.HTTPConnection(api.HOST, self.port, timeout=120)
+            try:
+                connection.request(method, path, payload, headers)
+                response = connection.getresponse()
+                data = response.read() # Chunked bodies (exports) are de-chunked here
+                if response.will_close:
+                    connection.close()
+                    self._local.connection = None
+                return response.status, data
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                self._local.connection = None
+                if attempt:
+                    raise # Retry once only: the server may have closed an idle keep-alive connection
+
+# --- Workload ---
+class Workload:
+    """Generates the requests of each operation against a dataset of n_requirements requirements."""
+
+    def __init__(self, n_requirements, seed=0):
+        self.n_requirements = n_requirements
+        self.rng = random.Random(seed)
+        self.created = [] # IDs made by "create", removed again by "delete" so the dataset keeps its size
+        self._lock = threading.Lock()
+
+    def next_request(self, operation, i):
+        with self._lock: # random.Random is not safe to share between threads
+            rng = self.rng
+            if operation == "list":
+                return "GET", f"{api.API_PREFIX}/requirements?tag={rng.choice(datagen.TAGS)}&sort=priority&limit=50", None
+            if operation == "get":
+                return "GET", f"{api.API_PREFIX}/requirements/REQ_{rng.randint(1, self.n_requirements)}", None
+            if operation == "create":
+                return "POST", f"{api.API_PREFIX}/requirements", {
+                    "name": f"Benchmark requirement {i}", "priority": rng.choice(datagen.PRIORITIES),
+                    "description": " ".join(rng.choice(datagen.TOPICS + datagen.FILLER) for _ in range(60)),
+                    "tags": rng.sample(datagen.TAGS, 2), "related_goal_id": ["GOAL_1"], "solution_assessments": []}
+            if operation == "update":
+                return "PUT", f"{api.API_PREFIX}/requirements/REQ_{rng.randint(1, self.n_requirements)}", {
+                    "name": f"Updated {i}", "priority": rng.choice(datagen.PRIORITIES)}
+            if operation == "delete":
+                return "DELETE", f"{api.API_PREFIX}/requirements/{self.created.pop()}", None
+            if operation == "search":
+                return "GET", f"/api/search?q={'+'.join(rng.sample(datagen.TOPICS, 3))}&k=10", None
+            if operation == "export_rtf":
+                return "GET", "/api/export/rtf", None
+        raise ValueError(f"Unknown operation '{operation}'")
+
+    def record(self, operation, status, body):
+        if operation == "create" and status == 201:
+            with self._lock:
+                self.created.append(json.loads(body)["id"])
+
+def run_operation(client, workload, operation, count, concurrency):
+    """Issues count requests of one operation from concurrency threads. Returns a result row."""
+    if operation in READ_OPERATIONS:
+        for i in range(WARMUP):
+            client.request(*workload.next_request(operation, i))
+    latencies, errors = [], []
+    numbers = itertools.count()
+
+    def worker():
+        while (i := next(numbers)) < count:
+            method, path, body = workload.next_request(operation, i)
+            start = time.perf_counter()
+            try:
+                status, response = client.request(method, path, body)
+            except (OSError, http.client.HTTPException):
+                errors.append(path)
+                continue
+            latencies.append(time.perf_counter() - start)
+            if status >= 400:
+                errors.append(path)
+            workload.record(operation, status, response)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    elapsed = time.perf_counter() - start
+    return {"op": operation, "requests": len(latencies), "rate": len(latencies) / elapsed if elapsed else 0.0,
+            "p50": percentile(latencies, 50), "p95": percentile(latencies, 95), "p99": percentile(latencies, 99),
+            "errors": len(errors)}
+
+def run_workload(client, n_requirements, args):
+    workload = Workload(n_requirements)
+    rows = []
+    for operation in args.operations:
+        count = args.exports if operation == "export_rtf" else min(args.requests, len(workload.created)) if operation == "delete" else args.requests
+        rows.append(run_operation(client, workload, operation, count, args.concurrency))
+    return rows
+
+# --- Runs, each on its own copy of a prepared dataset directory ---
+def prepare(directory, n_requirements):
+    """Writes a dataset and its search index into directory, so runs start warm. Runs in a subprocess."""
+    os.chdir(directory)
+    datagen.write_dataset(api.DATA_FILE, n_requirements)
+    api.load_data()
+    index = api.get_search_index()
+    index.wait_until_current()
+    index._save()
+    api.store.compact()
+
+def max_rss_kb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == "darwin" else rss # bytes on macOS, KiB elsewhere
+
+def run_inproc(directory, n_requirements, args):
+    """The in-process run. Runs in a subprocess so peak RSS is its own."""
+    os.chdir(directory)
+    api.load_data()
+    api.get_search_index().wait_until_current()
+    rows = run_workload(InProcessClient(), n_requirements, args)
+    return rows, max_rss_kb()
+
+def run_http(directory, n_requirements, args):
+    process = subprocess.Popen([sys.executable, API_SCRIPT, "--server", args.server, "--port", str(args.port),
+                                "--log-level", "WARNING"], cwd=directory,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for_port(args.port, process, timeout=300)
+        rows = run_workload(HTTPClient(args.port), n_requirements, args)
+        return rows, peak_rss_kb(process.pid)
+    finally:
+        process.terminate()
+        process.wait()
+
+def run_child(args):
+    """Entry point of the --prepare and --run subprocesses."""
+    if args.prepare:
+        prepare(args.prepare, args.sizes[0])
+        return
+    rows, rss_kb = run_inproc(args.run, args.sizes[0], args)
+    print(json.dumps({"rows": rows, "peak_rss_kb": rss_kb}))
+
+def child_command(args, n_requirements, *extra):
+    return [sys.executable, __file__, *extra, "--sizes", str(n_requirements), "--requests", str(args.requests),
+            "--exports", str(args.exports), "--concurrency", str(args.concurrency), "--operations", *args.operations]
+
+# --- Reporting ---
+def compare(row, baseline, tolerance):
+    """Describes how row moved against its baseline row; flags it if it got worse than tolerance allows."""
+    if baseline is None or not baseline["requests"] or not row["requests"]:
+        return "", False
+    latency = row["p50"] / baseline["p50"] - 1 if baseline["p50"] else 0.0
+    rate = row["rate"] / baseline["rate"] - 1 if baseline["rate"] else 0.0
+    regressed = latency > tolerance or rate < -tolerance or row["errors"] > baseline["errors"]
+    return f" | p50 {latency:+6.0%} rate {rate:+6.0%}{'  REGRESSION' if regressed else ''}", regressed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=datagen.SIZES, help="requirements per dataset")
+    parser.add_argument("--mode", choices=MODES, action="append", help="how to drive the handler (default: both)")
+    parser.add_argument("--operations", nargs="+", choices=OPERATIONS, default=OPERATIONS)
+    parser.add_argument("--requests", type=int, default=200, help="requests per operation")
+    parser.add_argument("--exports", type=int, default=3, help="RTF exports (each covers the whole dataset)")
+    parser.add_argument("--concurrency", type=int, default=1, help="client threads")
+    parser.add_argument("--server", choices=["threaded", "asyncio"], default="threaded", help="server for --mode http")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare with results saved by --save")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="relative slowdown reported as a regression")
+    parser.add_argument("--prepare", help=argparse.SUPPRESS)
+    parser.add_argument("--run", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.prepare or args.run:
+        run_child(args)
+        return
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = {(row["size"], row["mode"], row["op"]): row for row in json.load(f)["results"]}
+    results, regressions = [], 0
+    print(f"{args.requests} requests per operation, {args.exports} RTF exports, concurrency {args.concurrency}")
+    for n in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            prepared = os.path.join(tmp, "prepared")
+            os.mkdir(prepared)
+            start = time.perf_counter()
+            subprocess.run([sys.executable, __file__, "--prepare", prepared, "--sizes", str(n)], check=True)
+            print(f"\n{n} requirements ({os.path.getsize(os.path.join(prepared, api.DATA_FILE)) / 1e6:.0f} MB, "
+                  f"generated and indexed in {time.perf_counter() - start:.1f}s)")
+            print(f"{'mode':>6} {'operation':>10} | {'requests':>8} {'req/s':>8} {'p50':>9} {'p95':>9} {'p99':>9} {'errors':>6}")
+            for mode in args.mode or MODES:
+                directory = os.path.join(tmp, mode)
+                shutil.copytree(prepared, directory)
+                if mode == "inproc":
+                    output = subprocess.run(child_command(args, n, "--run", directory), check=True,
+                                            capture_output=True, text=True).stdout
+                    run = json.loads(output.strip().splitlines()[-1])
+                    rows, rss_kb = run["rows"], run["peak_rss_kb"]
+                else:
+                    rows, rss_kb = run_http(directory, n, args)
+                for row in rows:
+                    row.update(size=n, mode=mode, peak_rss_kb=rss_kb)
+                    delta, regressed = compare(row, baseline.get((n, mode, row["op"])), args.tolerance)
+                    regressions += regressed
+                    print(f"{mode:>6} {row['op']:>10} | {row['requests']:>8} {row['rate']:>8.1f} {row['p50'] * 1000:>7.2f}ms "
+                          f"{row['p95'] * 1000:>7.2f}ms {row['p99'] * 1000:>7.2f}ms {row['errors']:>6}{delta}")
+                results.extend(rows)
+                rss = f"{rss_kb / 1024:.1f} MB" if rss_kb is not None else "n/a"
+                print(f"{mode:>6} {'peak RSS':>10} | {rss}" + ("" if mode == "inproc" else " (server)"))
+                shutil.rmtree(directory)
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump({"python": sys.version.split()[0], "numpy": api.np is not None, "requests": args.requests,
+                       "concurrency": args.concurrency, "results": results}, f, indent=2)
+    if regressions:
+        sys.exit(f"\n{regressions} operation(s) regressed by more than {args.tolerance:.0%} against {args.baseline}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Compare mutation latency of the journaled DataStore against the old
+full-file rewrite as the dataset grows.
+Usage: python3 benchmarks/bench_journal.py [mutations_per_size]
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import api
+
+SIZES = [1000, 5000, 20000, 50000]
+
+def make_dataset(n_requirements):
+    """Builds a dataset with n_requirements realistic-looking requirement rows."""
+    data = api.empty_data()
+    data["requirements"] = [
+        {
+            "id": f"REQ_{i}",
+            "name": f"Requirement {i}",
+            "description": f"The platform shall support scenario {i} " * 8,
+            "type": "functional",
+            "priority": "Must Have",
+            "related_goal_id": [f"GOAL_{i % 50}"],
+            "tags": ["bench", f"t{i % 10}"],
+        }
+        for i in range(1, n_requirements + 1)
+    ]
+    return data
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def bench_journal(path, n_requirements, mutations):
+    store = api.DataStore(path)
+    store.snapshot() # Initial load is not part of the measurement
+    timings = []
+    for i in range(mutations):
+        item_id = f"REQ_{1 + (i * 7919) % n_requirements}"
+        start = time.perf_counter()
+        store.update_item("requirements", item_id, {"name": f"Updated {i}"})
+        timings.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    store.compact()
+    compact_time = time.perf_counter() - start
+    store.journal.close()
+    return timings, compact_time
+
+def bench_full_rewrite(path, data, mutations):
+    """The pre-journal behaviour: update in memory, then rewrite the whole file."""
+    timings = []
+    items = data["requirements"]
+    for i in range(mutations):
+        start = time.perf_counter()
+        items[(i * 7919) % len(items)] = dict(items[(i * 7919) % len(items)], name=f"Updated {i}")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        timings.append(time.perf_counter() - start)
+    return timings
+
+def main():
+    mutations = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    print(f"{'requirements':>12} | {'journal p50':>11} {'journal p99':>11} {'compaction':>10} | {'rewrite p50':>11} {'rewrite p99':>11}")
+    for n in SIZES:
+        data = make_dataset(n)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "data.json")
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            journal_timings, compact_time = bench_journal(path, n, mutations)
+            rewrite_timings = bench_full_rewrite(os.path.join(tmp, "rewrite.json"), data, mutations)
+        print(f"{n:>12} | {percentile(journal_timings, 50) * 1000:>9.2f}ms {percentile(journal_timings, 99) * 1000:>9.2f}ms "
+              f"{compact_time * 1000:>8.1f}ms | {percentile(rewrite_timings, 50) * 1000:>9.2f}ms {percentile(rewrite_timings, 99) * 1000:>9.2f}ms")
+
+if __name__ == "__main__":
+    main()
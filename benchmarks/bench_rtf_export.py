@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Compare the streaming RTF export against the previous build-everything-
+then-send implementation: time to first byte, total time and peak RSS.
+Each variant runs in its own subprocess so peak RSS is not shared.
+Usage: python3 benchmarks/bench_rtf_export.py [requirements ...]
+"""
+
+import os
+import sys
+import json
+import time
+import resource
+import subprocess
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import api
+
+SIZES = [1000, 10000, 50000]
+
+# --- The export as it was before streaming, kept for comparison ---
+def legacy_escape_rtf(text):
+    if text is None:
+        return ""
+    text = str(text).replace('\\', '\\\\').replace('{', '\\{').replace('}', '\\}')
+    encoded = []
+    for char in text:
+        codepoint = ord(char)
+        encoded.append(char if codepoint < 128 else f'\\u{codepoint}?')
+    return "".join(encoded)
+
+def legacy_generate_rtf_recursive(data, indent_level=0):
+    rtf_str = ""
+    indent = '\\li' + str(indent_level * 720) + '\\fi-' + str(indent_level * 720) + ' '
+    if isinstance(data, dict):
+        for key, value in data.items():
+            rtf_str += f"\\pard {indent} \\b {legacy_escape_rtf(key)}:\\b0 "
+            if isinstance(value, (dict, list)):
+                rtf_str += "\\par\n"
+                rtf_str += legacy_generate_rtf_recursive(value, indent_level + 1)
+            else:
+                rtf_str += f"\\tab {legacy_escape_rtf(value)}\\par\n"
+    elif isinstance(data, list):
+        for index, item in enumerate(data):
+            rtf_str += f"\\pard {indent} \\bullet Item {index + 1}:\\par\n"
+            rtf_str += legacy_generate_rtf_recursive(item, indent_level + 1)
+            rtf_str += "\\par\n"
+    else:
+        rtf_str += f"\\pard {indent} {legacy_escape_rtf(data)}\\par\n"
+    return rtf_str
+
+def legacy_export(data):
+    header = "{\\rtf1\\ansi\\deff0\\nouicompat{\\fonttbl{\\f0 Arial;}{\\f1 Courier New;}}\\pard\\sa200\\sl276\\slmult1\\f0\\fs24\n"
+    yield (header + legacy_generate_rtf_recursive(data) + "\n}").encode('ascii', errors='ignore')
+
+def streaming_export(data):
+    return api.encode_chunks(api.generate_rtf_fragments(data))
+
+def make_dataset(n_requirements):
+    data = api.empty_data()
+    data["requirements"] = [
+        {
+            "id": f"REQ_{i}",
+            "name": f"Requirement {i} – données client",
+            "description": f"The platform shall support scenario {i} with {{templated}} values. " * 6,
+            "priority": "Must Have",
+            "related_goal_id": [f"GOAL_{i % 50}", f"GOAL_{i % 7}"],
+            "solution_assessments": [{"solution_id": "SOL_1", "result": "available", "description": ""}],
+        }
+        for i in range(1, n_requirements + 1)
+    ]
+    return data
+
+def max_rss_kb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == "darwin" else rss # bytes on macOS, KiB elsewhere
+
+def run_variant(variant, n_requirements):
+    """Runs one export into /dev/null and prints its measurements as JSON."""
+    data = make_dataset(n_requirements)
+    export = legacy_export if variant == "legacy" else streaming_export
+    baseline_kb = max_rss_kb()
+    first_byte = None
+    total_bytes = 0
+    start = time.perf_counter()
+    with open(os.devnull, 'wb') as sink:
+        for chunk in export(data):
+            if first_byte is None:
+                first_byte = time.perf_counter() - start
+            sink.write(chunk)
+            total_bytes += len(chunk)
+    elapsed = time.perf_counter() - start
+    print(json.dumps({"ttfb": first_byte, "total": elapsed, "bytes": total_bytes,
+                      "peak_rss_delta_kb": max_rss_kb() - baseline_kb}))
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+    print(f"{'requirements':>12} {'variant':>9} | {'TTFB':>9} {'total':>9} {'size':>9} {'peak RSS +':>11}")
+    for n in sizes:
+        for variant in ("legacy", "streaming"):
+            output = subprocess.run([sys.executable, __file__, "--run", variant, str(n)],
+                                    check=True, capture_output=True, text=True).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{n:>12} {variant:>9} | {result['ttfb'] * 1000:>7.1f}ms {result['total'] * 1000:>7.1f}ms "
+                  f"{result['bytes'] / 1e6:>7.1f}MB {result['peak_rss_delta_kb'] / 1024:>9.1f}MB")
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "--run":
+        run_variant(sys.argv[2], int(sys.argv[3]))
+    else:
+        main()
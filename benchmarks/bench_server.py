@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Load-test the threaded and asyncio servers: many concurrent keep-alive
+clients issuing item reads (and a few updates), reporting throughput,
+p50/p99 latency, errors and the server's peak RSS. Each server runs in its
+own subprocess on a temporary copy of a generated dataset.
+Usage: python3 benchmarks/bench_server.py [--clients 1000] [--duration 20] [--streams 0]
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import socket
+import asyncio
+import argparse
+import resource
+import tempfile
+import subprocess
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import api
+
+API_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api.py")
+SERVERS = ["threaded", "asyncio"]
+REQUEST_TIMEOUT = 30 # Seconds before a request counts as an error
+
+def make_dataset(n_requirements):
+    data = api.empty_data()
+    data["requirements"] = [
+        {
+            "id": f"REQ_{i}",
+            "name": f"Requirement {i}",
+            "description": f"The platform shall support scenario {i} " * 8,
+            "priority": "Must Have",
+            "tags": ["bench", f"t{i % 10}"],
+        }
+        for i in range(1, n_requirements + 1)
+    ]
+    return data
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] if ordered else float("nan")
+
+def peak_rss_kb(pid):
+    """VmHWM of a live process (Linux only), or None."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+class StatusError(Exception):
+    pass
+
+async def request(reader, writer, method, path, body=b""):
+    """Sends one request and reads the response; returns True if the server keeps the connection open."""
+    head = f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n"
+    if body:
+        head += "Content-Type: application/json\r\n"
+    writer.write(head.encode() + b"\r\n" + body)
+    status_line = await reader.readuntil(b"\r\n")
+    headers = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1").lower()
+    length = 0
+    for line in headers.split("\r\n"):
+        if line.startswith("content-length:"):
+            length = int(line.split(":", 1)[1])
+    await reader.readexactly(length)
+    if not status_line.split()[1].startswith(b"2"):
+        raise StatusError(status_line.decode().strip())
+    return "connection: close" not in headers
+
+async def client(port, n_requirements, deadline, latencies, errors, write_every):
+    rng = random.Random()
+    connection = None
+    sent = 0
+    while time.perf_counter() < deadline:
+        item_id = f"REQ_{rng.randint(1, n_requirements)}"
+        sent += 1
+        if write_every and sent % write_every == 0:
+            method, body = "PUT", json.dumps({"name": f"Load {sent}"}).encode()
+        else:
+            method, body = "GET", b""
+        start = time.perf_counter() # Includes waiting for a connection, as a browser would
+        keep = False
+        for may_retry in (True, False):
+            reused = connection is not None
+            try:
+                if connection is None:
+                    connection = await asyncio.wait_for(asyncio.open_connection(api.HOST, port), REQUEST_TIMEOUT)
+                keep = await asyncio.wait_for(request(*connection, method, f"/api/entities/requirements/{item_id}", body), REQUEST_TIMEOUT)
+                latencies.append(time.perf_counter() - start)
+            except (asyncio.TimeoutError, StatusError): # TimeoutError is an OSError on Python 3.11+
+                errors.append(1)
+            except (OSError, asyncio.IncompleteReadError):
+                if connection is not None:
+                    connection[1].close()
+                    connection = None
+                if reused and may_retry:
+                    continue # The server closed the idle keep-alive connection: retry once on a new one, like a browser
+                errors.append(1)
+            break
+        if not keep and connection is not None:
+            connection[1].close()
+            connection = None
+    if connection is not None:
+        connection[1].close()
+
+async def hold_stream(port, deadline):
+    """An idle browser tab: a change stream left open for the whole run, reconnecting when the server ends it."""
+    while time.perf_counter() < deadline:
+        try:
+            reader, writer = await asyncio.open_connection(api.HOST, port)
+            writer.write(b"GET /api/changes HTTP/1.1\r\nHost: localhost\r\nAccept: text/event-stream\r\n\r\n")
+            while await asyncio.wait_for(reader.read(65536), max(0.1, deadline - time.perf_counter())):
+                pass
+            writer.close()
+        except (OSError, asyncio.TimeoutError):
+            pass
+        await asyncio.sleep(api.CHANGE_STREAM_RETRY_MS / 1000)
+
+async def run_load(port, args):
+    latencies, errors = [], []
+    deadline = time.perf_counter() + args.duration
+    streams = [asyncio.ensure_future(hold_stream(port, deadline)) for _ in range(args.streams)]
+    await asyncio.sleep(0.5 if streams else 0)
+    start = time.perf_counter()
+    await asyncio.gather(*(client(port, args.requirements, deadline, latencies, errors, args.write_every)
+                           for _ in range(args.clients)))
+    elapsed = time.perf_counter() - start
+    for stream in streams:
+        stream.cancel()
+    await asyncio.gather(*streams, return_exceptions=True)
+    return latencies, errors, elapsed
+
+def wait_for_port(port, process, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("server exited during startup")
+        try:
+            socket.create_connection((api.HOST, port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("server did not start")
+
+def bench_server(server, port, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.path.join(tmp, api.DATA_FILE), 'w', encoding='utf-8') as f:
+            json.dump(make_dataset(args.requirements), f)
+        process = subprocess.Popen([sys.executable, API_SCRIPT, "--server", server, "--port", str(port),
+                                    "--workers", str(args.workers)], cwd=tmp,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_for_port(port, process)
+            baseline_kb = peak_rss_kb(process.pid)
+            latencies, errors, elapsed = asyncio.run(run_load(port, args))
+            peak_kb = peak_rss_kb(process.pid)
+        finally:
+            process.terminate()
+            process.wait()
+    return latencies, errors, elapsed, baseline_kb, peak_kb
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=1000, help="concurrent keep-alive clients")
+    parser.add_argument("--duration", type=float, default=20, help="seconds of load per server")
+    parser.add_argument("--streams", type=int, default=0, help="extra idle change-stream connections (open tabs)")
+    parser.add_argument("--requirements", type=int, default=5000, help="dataset size")
+    parser.add_argument("--workers", type=int, default=api.MAX_WORKERS, help="server worker threads")
+    parser.add_argument("--write-every", type=int, default=20, help="every Nth request is a PUT (0: reads only)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--server", choices=SERVERS, action="append", help="server(s) to test (default: both)")
+    args = parser.parse_args()
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE) # Clients and the server each need a descriptor per connection
+    wanted = 2 * (args.clients + args.streams) + 256
+    if soft != resource.RLIM_INFINITY and soft < wanted:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (wanted if hard == resource.RLIM_INFINITY else min(wanted, hard), hard))
+
+    print(f"{args.clients} clients, {args.streams} idle streams, {args.duration:.0f}s, {args.workers} workers")
+    print(f"{'server':>9} | {'requests':>8} {'req/s':>8} {'p50':>9} {'p99':>9} {'errors':>6} | {'RSS idle':>9} {'RSS peak':>9}")
+    for server in args.server or SERVERS:
+        latencies, errors, elapsed, baseline_kb, peak_kb = bench_server(server, args.port, args)
+        rss = lambda kb: f"{kb / 1024:>7.1f}MB" if kb is not None else f"{'n/a':>9}"
+        print(f"{server:>9} | {len(latencies):>8} {len(latencies) / elapsed:>8.0f} {percentile(latencies, 50) * 1000:>7.1f}ms "
+              f"{percentile(latencies, 99) * 1000:>7.1f}ms {len(errors):>6} | {rss(baseline_kb)} {rss(peak_kb)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Generate a synthetic dataset with the schema of requirements_data.json:
+all eight entity types plus solutions, cross-referenced the way the web UI
+links them, with text of realistic length. The other types are sized
+relative to the number of requirements. The same size and seed always give
+the same data.
+Usage: python3 benchmarks/datagen.py [requirements] [-o requirements_data.json] [--seed 0]
+"""
+
+import os
+import sys
+import json
+import random
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import api
+
+SIZES = [1000, 10000, 100000] # Requirements; the benchmarks' small, medium and large datasets
+
+TOPICS = ["login", "password", "payment", "invoice", "refund", "report", "dashboard", "export",
+          "audit", "logging", "user", "role", "permission", "cache", "search", "index", "mobile",
+          "offline", "sync", "notification", "email", "ledger", "tax", "shipping", "inventory",
+          "backup", "restore", "latency", "throughput", "encryption", "consent", "retention",
+          "customer", "order", "contract", "supplier", "catalogue", "pricing", "forecast", "model"]
+FILLER = ["the system shall", "support", "allow", "within", "seconds", "for every", "administrator",
+          "record", "request", "and", "with", "on", "each", "when", "after", "provide", "ensure",
+          "be able to", "the user", "must", "automatically", "daily", "across", "all", "data"]
+FIRST_NAMES = ["Alice", "Bob", "Chloé", "David", "Emma", "Farid", "Grace", "Hugo", "Inès", "Jonas", "Karin", "Luca"]
+LAST_NAMES = ["Johnson", "Smith", "Dubois", "Peeters", "Müller", "Rossi", "Nowak", "García", "Janssens", "Larsen"]
+ROLES = ["CTO", "Business Analyst", "Product Owner", "Architect", "Data Steward", "Operations Manager"]
+DEPARTMENTS = ["IT", "Finance", "Sales", "Operations", "Legal", "Marketing", "HR"]
+SYSTEM_TYPES = ["CRM", "ERP", "Data Warehouse", "Portal", "Middleware", "Mobile App"]
+PRIORITIES = list(api.PRIORITY_ORDER)
+ASSESSMENT_RESULTS = ["available", "partially_available", "not_available", ""]
+VERSIONS = ["1.0", "1.1", "2.0", "2.1"]
+TAGS = TOPICS[:24]
+
+def sizes_for(n_requirements):
+    """Items per entity type for a dataset with n_requirements requirements."""
+    return {
+        "stakeholders": max(5, n_requirements // 200),
+        "goals_and_objectives": max(10, n_requirements // 20),
+        "business_processes": max(5, n_requirements // 50),
+        "requirements": n_requirements,
+        "systems_and_applications": max(5, n_requirements // 100),
+        "data_entities": max(5, n_requirements // 100),
+        "risks_and_constraints": max(5, n_requirements // 20),
+        "metrics_and_kpis": max(5, n_requirements // 50),
+        "solutions": max(3, min(10, n_requirements // 10000)),
+    }
+
+def make_ids(entity_type, count):
+    prefix = "SOL" if entity_type == "solutions" else api.ID_PREFIXES[entity_type]
+    return [f"{prefix}_{i}" for i in range(1, count + 1)]
+
+def generate(n_requirements, seed=0):
+    """Returns a dataset dict {entity type: [items]} with n_requirements requirements."""
+    rng = random.Random(seed * 1000003 + n_requirements)
+    ids = {entity_type: make_ids(entity_type, count) for entity_type, count in sizes_for(n_requirements).items()}
+
+    def sentence(min_words, max_words):
+        topics = rng.sample(TOPICS, 3)
+        words = [rng.choice(topics) if rng.random() < 0.4 else rng.choice(FILLER) for _ in range(rng.randint(min_words, max_words))]
+        return " ".join(words).capitalize() + "."
+
+    def title(words=4):
+        return " ".join(rng.choice(TOPICS) for _ in range(words)).capitalize()
+
+    def some(entity_type, low, high):
+        return rng.sample(ids[entity_type], min(len(ids[entity_type]), rng.randint(low, high)))
+
+    data = {entity_type: [] for entity_type in ids}
+    for item_id in ids["stakeholders"]:
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        data["stakeholders"].append({
+            "id": item_id, "name": f"{first} {last}", "role": rng.choice(ROLES),
+            "contact_information": {"email": f"{first.lower()}.{last.lower()}.{item_id.lower()}@example.com",
+                                    "phone": f"+32{rng.randrange(10 ** 8, 10 ** 9)}"},
+            "department": rng.choice(DEPARTMENTS),
+        })
+    for item_id in ids["goals_and_objectives"]:
+        data["goals_and_objectives"].append({
+            "id": item_id, "description": sentence(6, 20), "priority": rng.choice(["high", "medium", "low"]),
+            "stakeholder_id": rng.choice(ids["stakeholders"]), "deadline": f"{rng.randint(2024, 2027)}-{rng.randint(1, 12):02d}-28",
+        })
+    for item_id in ids["business_processes"]:
+        data["business_processes"].append({
+            "id": item_id, "name": title(3), "description": sentence(10, 40), "owner": rng.choice(ids["stakeholders"]),
+            "department": rng.choice(DEPARTMENTS), "inputs": [title(2) for _ in range(rng.randint(0, 3))],
+            "outputs": [title(2) for _ in range(rng.randint(0, 3))],
+        })
+    for item_id in ids["requirements"]:
+        requirement = {
+            "id": item_id, "name": title(rng.randint(3, 6)),
+            "description": " ".join(sentence(8, 24) for _ in range(rng.randint(2, 6))),
+            "type": rng.choice(["functional", "non-functional"]), "priority": rng.choice(PRIORITIES),
+            "source": rng.choice(ids["stakeholders"]), "related_goal_id": some("goals_and_objectives", 0, 3),
+            "related_process_id": some("business_processes", 0, 2), "author": rng.choice(FIRST_NAMES),
+            "tags": rng.sample(TAGS, rng.randint(0, 3)),
+            "solution_assessments": [{"solution_id": solution_id, "result": rng.choice(ASSESSMENT_RESULTS),
+                                      "description": sentence(4, 12) if rng.random() < 0.3 else ""}
+                                     for solution_id in ids["solutions"] if rng.random() < 0.7],
+        }
+        if rng.random() < 0.5:
+            requirement["version"] = rng.choice(VERSIONS)
+        data["requirements"].append(requirement)
+    for item_id in ids["systems_and_applications"]:
+        data["systems_and_applications"].append({
+            "id": item_id, "name": f"{title(2)} System", "description": sentence(6, 20), "owner": rng.choice(ids["stakeholders"]),
+            "type": rng.choice(SYSTEM_TYPES), "integration_points": [f"{title(2)} System" for _ in range(rng.randint(0, 3))],
+            "related_requirements": some("requirements", 1, 20),
+        })
+    for item_id in ids["data_entities"]:
+        data["data_entities"].append({
+            "id": item_id, "name": f"{title(2)} Data", "description": sentence(6, 20),
+            "attributes": [title(2) for _ in range(rng.randint(2, 8))], "related_systems": some("systems_and_applications", 1, 3),
+        })
+    for item_id in ids["risks_and_constraints"]:
+        data["risks_and_constraints"].append({
+            "id": item_id, "description": sentence(6, 20), "impact": sentence(4, 12), "mitigation_strategy": sentence(6, 20),
+            "related_requirements": some("requirements", 1, 5),
+        })
+    for item_id in ids["metrics_and_kpis"]:
+        data["metrics_and_kpis"].append({
+            "id": item_id, "name": title(3), "description": sentence(6, 20), "target_value": f"{rng.randint(5, 99)}%",
+            "related_goals": some("goals_and_objectives", 1, 3),
+        })
+    for item_id in ids["solutions"]:
+        data["solutions"].append({"id": item_id, "name": f"{title(2)} Suite", "description": sentence(6, 20)})
+    return data
+
+def write_dataset(path, n_requirements, seed=0):
+    """Generates a dataset and writes it to path as the server would read it. Returns the data."""
+    data = generate(n_requirements, seed)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    return data
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("requirements", nargs="?", type=int, default=SIZES[0], help="number of requirements")
+    parser.add_argument("-o", "--output", default=api.DATA_FILE, help="file to write")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    if os.path.exists(args.output) and os.path.abspath(args.output) == os.path.abspath(api.DATA_FILE):
+        sys.exit(f"Refusing to overwrite {args.output} in the current directory; pass -o to choose another file.")
+    data = write_dataset(args.output, args.requirements, args.seed)
+    counts = ", ".join(f"{len(items)} {entity_type}" for entity_type, items in data.items())
+    print(f"Wrote {args.output} ({os.path.getsize(args.output) / 1e6:.1f} MB): {counts}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import api
+
+
+class BackupTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        path = os.path.join(self.tmp, "data.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"requirements": [{"id": "REQ_1", "name": "first"}]}, f)
+        self.store = api.DataStore(path)
+        self.backup_dir = os.path.join(self.tmp, "backups")
+
+    def tearDown(self):
+        self.store.journal.close()
+        shutil.rmtree(self.tmp)
+
+    def test_restore_prefers_the_snapshot_taken_after_a_restart(self):
+        backups = api.BackupManager(self.store, self.backup_dir)
+        backups.backup_now(datetime(2025, 4, 1, 10))
+        self.store.update_item("requirements", "REQ_1", {"name": "second"})
+        backups.backup_now(datetime(2025, 4, 1, 11))
+        self.store.update_item("requirements", "REQ_1", {"name": "third"})
+        api.BackupManager(self.store, self.backup_dir).backup_now(datetime(2025, 4, 1, 11, 30)) # After a restart
+        self.assertEqual([name.split(".", 2)[2] for name, _ in api.list_backups(self.backup_dir, "data")],
+                         ["full.json.gz", "delta.json.gz", "full.json.gz"])
+        restored = api.restore_backup("2025-04-01-11", self.backup_dir, "data")
+        self.assertEqual(restored["requirements"][0]["name"], "third")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import api
+
+
+class FieldIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        path = os.path.join(self.tmp, "data.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"requirements": [
+                {"id": "REQ_1", "name": "first", "tags": ["a"]},
+                {"name": "no id", "tags": ["a"]},
+                {"id": "REQ_1", "name": "repeats REQ_1", "tags": ["a"]},
+                {"id": "REQ_2", "name": "other", "tags": ["b"]},
+            ]}, f)
+        self.store = api.DataStore(path)
+        self.index = api.FieldIndex()
+        self.index.attach(self.store)
+
+    def tearDown(self):
+        self.store.journal.close()
+        shutil.rmtree(self.tmp)
+
+    def names(self, filters, sort=None):
+        page, total, _ = self.index.query("requirements", filters, sort)
+        self.assertEqual(total, len(page))
+        return [item["name"] for item in page]
+
+    def test_item_without_id_appears_in_filtered_listing(self):
+        self.assertEqual(self.names([("tags", "a")]), ["first", "no id", "repeats REQ_1"])
+        self.assertEqual(self.names([("tags", "a")], sort="-name"), ["repeats REQ_1", "no id", "first"])
+
+    def test_filtered_listing_follows_mutations(self):
+        self.store.update_item("requirements", "REQ_2", {"tags": ["a"]})
+        self.assertEqual(self.names([("tags", "a")]), ["first", "no id", "repeats REQ_1", "other"])
+        self.store.delete_item("requirements", "REQ_1") # Removes the item repeating the ID as well
+        self.assertEqual(self.names([("tags", "a")]), ["no id", "other"])
+        self.assertEqual([item["name"] for item in self.store.list_items("requirements")], ["no id", "other"])
+
+    def test_paging_past_an_item_without_id(self):
+        for filters in ([], [("tags", "a")]):
+            page, total, cursor = self.index.query("requirements", filters, limit=2)
+            self.assertEqual([item["name"] for item in page], ["first", "no id"])
+            self.assertIsNotNone(cursor)
+            page, _, cursor = self.index.query("requirements", filters, cursor=cursor, limit=2)
+            self.assertEqual([item["name"] for item in page], ["repeats REQ_1", "other"][:total - 2])
+            self.assertIsNone(cursor)
+
+
+if __name__ == "__main__":
+    unittest.main()
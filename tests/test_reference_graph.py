@@ -0,0 +1,53 @@
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import api
+
+
+class ReferenceGraphTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        path = os.path.join(self.tmp, "data.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({
+                "goals_and_objectives": [{"id": "GOAL_1"}],
+                "requirements": [
+                    {"id": "REQ_1", "name": "first", "related_goal_id": ["GOAL_1"]},
+                    {"name": "no id", "related_goal_id": ["GOAL_1", "GOAL_9"]},
+                    {"id": "REQ_1", "name": "repeats REQ_1", "related_goal_id": ["GOAL_9"]},
+                ],
+            }, f)
+        self.store = api.DataStore(path)
+        self.graph = api.ReferenceGraph()
+        self.graph.attach(self.store)
+
+    def tearDown(self):
+        self.store.journal.close()
+        shutil.rmtree(self.tmp)
+
+    def test_items_without_or_repeating_an_id_are_referrers(self):
+        self.assertEqual([(d["id"], d["name"]) for d in self.graph.impact("goals_and_objectives", "GOAL_1")],
+                         [("REQ_1", "first"), (None, "no id")])
+        self.assertEqual([(d["id"], d["target_id"]) for d in self.graph.dangling()],
+                         [(None, "GOAL_9"), ("REQ_1", "GOAL_9")])
+        with self.assertRaises(api.IntegrityError):
+            self.graph.restrict_delete("goals_and_objectives", "GOAL_1")
+
+    def test_delete_drops_the_references_of_items_repeating_the_id(self):
+        self.store.delete_item("requirements", "REQ_1")
+        self.assertEqual([d["id"] for d in self.graph.dangling()], [None])
+        with self.store.read_collections() as collections:
+            incremental = (self.graph._outgoing, self.graph._incoming, self.graph._missing)
+            fresh = api.ReferenceGraph()
+            fresh.store = self.store
+            fresh._rebuild(collections)
+            self.assertEqual(incremental, (fresh._outgoing, fresh._incoming, fresh._missing))
+
+
+if __name__ == "__main__":
+    unittest.main()